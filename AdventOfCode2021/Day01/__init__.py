@@ -1,5 +1,10 @@
-import time
-from typing import List
+import os
+from collections import deque
+from typing import List, Iterable, Iterator, Dict
+
+import numpy as np
+
+from AdventOfCode2021.loaders import load_ints, iter_lines
 
 
 def diff(numbers: List[int]) -> List[int]:
@@ -14,12 +19,103 @@ def no_of_positive_numbers(numbers: List[int]) -> int:
     return sum(n > 0 for n in numbers)
 
 
+def count_increases(numbers: Iterable[int], window: int = 1) -> int:
+    # Two neighbouring windows share all but one number on each end:
+    # sum(a[i+1:i+k+1]) - sum(a[i:i+k]) == a[i+k] - a[i]
+    # so there is no need to sum windows at all and only last k numbers have to be kept in memory
+    if window < 1:
+        raise ValueError(f"Window size must be positive, got {window}")
+    last_numbers = deque(maxlen=window)
+    count = 0
+    for n in numbers:
+        if len(last_numbers) == window:
+            count += n > last_numbers[0]
+        last_numbers.append(n)
+    return count
+
+
+def count_increases_array(numbers: np.ndarray, window: int = 1) -> int:
+    # Same identity as in count_increases, but for numbers already in memory
+    if window < 1:
+        raise ValueError(f"Window size must be positive, got {window}")
+    numbers = np.asarray(numbers)
+    return int(np.count_nonzero(numbers[window:] > numbers[:-window]))
+
+
+class SonarMonitor:
+    """
+    Counts depth increases of live readings for several window sizes at once.
+    Uses the same identity as count_increases, so every reading costs one comparison per window size,
+    and only the last max(windows) readings are kept in a ring buffer.
+    """
+
+    def __init__(self, windows: Iterable[int] = (1, 3)):
+        self.windows = tuple(sorted(set(windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError(f"Window sizes must be positive, got {windows}")
+        self._buffer = [0] * self.windows[-1]
+        self._counts = [0] * len(self.windows)
+        self.no_of_readings = 0
+
+    def push(self, depth: int) -> None:
+        size = len(self._buffer)
+        for i, window in enumerate(self.windows):
+            if self.no_of_readings >= window:
+                # Reading from `window` steps ago
+                self._counts[i] += depth > self._buffer[(self.no_of_readings - window) % size]
+        # Overwrite only after comparing, the biggest window looks at the very slot being replaced
+        self._buffer[self.no_of_readings % size] = depth
+        self.no_of_readings += 1
+
+    def extend(self, depths: Iterable[int]) -> None:
+        for depth in depths:
+            self.push(depth)
+
+    def __getitem__(self, window: int) -> int:
+        return self._counts[self.windows.index(window)]
+
+    @property
+    def counts(self) -> Dict[int, int]:
+        return dict(zip(self.windows, self._counts))
+
+    def __repr__(self):
+        return f"SonarMonitor(readings={self.no_of_readings}, counts={self.counts})"
+
+
+def iter_measurements(path: str) -> Iterator[int]:
+    for line in iter_lines(path):
+        if line.strip():
+            yield int(line)
+
+
+def load_case(path: str) -> np.ndarray:
+    return load_ints(path)
+
+
+def solve_p1(measurements: np.ndarray) -> int:
+    return count_increases_array(measurements, window=1)
+
+
+def solve_p2(measurements: np.ndarray) -> int:
+    return count_increases_array(measurements, window=3)
+
+
 if __name__ == '__main__':
-    with open("data.txt", "r") as f:
-        measurements = [int(line.strip()) for line in f.readlines()]
-    t = time.perf_counter()
-    no_of_positive_diffs = no_of_positive_numbers(diff(measurements))
-    print(f"Part 1: {no_of_positive_diffs} (t: {1000*(time.perf_counter() - t):.3f} ms)")
-    t = time.perf_counter()
-    no_of_positive_diffs3 = no_of_positive_numbers(diff(sum_window_3(measurements)))
-    print(f"Part 2: {no_of_positive_diffs3} (t: {1000*(time.perf_counter() - t):.3f} ms)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Test
+    test_case = [199, 200, 208, 210, 200, 207, 240, 269, 260, 263]
+    assert no_of_positive_numbers(diff(test_case)) == 7
+    assert no_of_positive_numbers(diff(sum_window_3(test_case))) == 5
+    assert count_increases(iter(test_case), window=1) == 7
+    assert count_increases(iter(test_case), window=3) == 5
+    assert count_increases_array(test_case, window=1) == 7
+    assert count_increases_array(test_case, window=3) == 5
+    test_monitor = SonarMonitor(windows=(1, 3))
+    test_monitor.push(test_case[0])
+    test_monitor.extend(test_case[1:])
+    assert test_monitor.counts == {1: 7, 3: 5}, test_monitor
+
+    measurements = load_case(os.path.join(here, "data.txt"))
+    assert count_increases(iter_measurements(os.path.join(here, "data.txt")), window=3) == solve_p2(measurements)
+    print(f"Part 1: {solve_p1(measurements)}")
+    print(f"Part 2: {solve_p2(measurements)}")
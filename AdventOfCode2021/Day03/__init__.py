@@ -1,6 +1,13 @@
-import time
+import os
 from collections import Counter
-from typing import List
+from typing import List, Tuple
+
+import numpy as np
+
+from AdventOfCode2021.loaders import load_digit_grid
+
+# Packed diagnostic report: unsigned integers plus the number of bits in every row
+Report = Tuple[np.ndarray, int]
 
 
 def count_bits(binary_strings: List[str]) -> List[Counter]:
@@ -29,7 +36,92 @@ def filter_out_string(binary_strings: List[str], most_common: bool = True) -> st
     return "".join(binary_strings)
 
 
+def pack_bits(bits: np.ndarray) -> Report:
+    # bits is a (rows, width) array of zeros and ones, first column being the most significant bit
+    rows, width = bits.shape
+    if width > 64:
+        raise ValueError(f"Rows of {width} bits don't fit into uint64")
+    if bits.size and bits.max() > 1:
+        raise ValueError("Diagnostic report can only contain zeros and ones")
+    values = np.zeros(rows, dtype=np.uint64)
+    for column in bits.T:
+        values <<= np.uint64(1)
+        values |= column
+    return values, width
+
+
+def pack_strings(binary_strings: List[str]) -> Report:
+    width = len(binary_strings[0])
+    raw = np.frombuffer("".join(binary_strings).encode(), dtype=np.uint8)
+    return pack_bits(raw.reshape(-1, width) - ord("0"))
+
+
+def count_ones(report: Report) -> np.ndarray:
+    # Number of ones in every column, most significant bit first
+    values, width = report
+    return np.array([np.count_nonzero(values & np.uint64(1 << bit)) for bit in reversed(range(width))])
+
+
+def gamma_epsilon(report: Report) -> Tuple[int, int]:
+    values, width = report
+    ones = count_ones(report)
+    gamma = 0
+    for is_one in ones * 2 >= values.size:
+        gamma = (gamma << 1) | int(is_one)
+    # Least common bits are simply the other ones
+    epsilon = gamma ^ ((1 << width) - 1)
+    return gamma, epsilon
+
+
+def find_rating(sorted_values: np.ndarray, width: int, most_common: bool = True) -> int:
+    """
+    Bit criteria filtering over sorted values.
+    Values left at every step share all the bits checked so far, so they form a contiguous range [lo, hi)
+    in which values with the current bit set come last. Every step is then a single binary search.
+    """
+    if not sorted_values.size:
+        raise ValueError("Diagnostic report is empty")
+    lo, hi = 0, sorted_values.size
+    prefix = 0
+    for bit in reversed(range(width)):
+        if hi - lo <= 1:
+            break
+        mid = lo + int(np.searchsorted(sorted_values[lo:hi], np.uint64(prefix | (1 << bit))))
+        zeros, ones = mid - lo, hi - mid
+        keep_ones = ones >= zeros if most_common else ones < zeros
+        # Never go for an empty group, when all values share the bit
+        if not zeros or not ones:
+            keep_ones = not zeros
+        if keep_ones:
+            lo = mid
+            prefix |= 1 << bit
+        else:
+            hi = mid
+    return int(sorted_values[lo])
+
+
+def life_support_ratings(report: Report) -> Tuple[int, int]:
+    values, width = report
+    sorted_values = np.sort(values)
+    return find_rating(sorted_values, width, most_common=True), find_rating(sorted_values, width, most_common=False)
+
+
+def load_case(path: str) -> Report:
+    return pack_bits(load_digit_grid(path))
+
+
+def solve_p1(report: Report) -> int:
+    gamma, epsilon = gamma_epsilon(report)
+    return gamma * epsilon
+
+
+def solve_p2(report: Report) -> int:
+    oxygen, co2 = life_support_ratings(report)
+    return oxygen * co2
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     test_case = [
         "00100",
         "11110",
@@ -53,28 +145,15 @@ if __name__ == '__main__':
     most_common_int = int(most_common_bit_string, 2)
     least_common_int = int(least_common_bit_string, 2)
     assert most_common_int * least_common_int == expected_answer1
+    assert solve_p1(pack_strings(test_case)) == expected_answer1
     # Test Case 2
     p2_most_common_str = filter_out_string(test_case, most_common=True)
     p2_least_common_str = filter_out_string(test_case, most_common=False)
     p2_most_common_int = int(p2_most_common_str, 2)
     p2_least_common_int = int(p2_least_common_str, 2)
     assert p2_least_common_int * p2_most_common_int == expected_answer2
+    assert solve_p2(pack_strings(test_case)) == expected_answer2
 
-    with open("data.txt", "r") as f:
-        data = [line.strip() for line in f.readlines()]
-    # Part 1
-    t = time.perf_counter()
-    data_count = count_bits(data)
-    most_common_bit_string = "".join([counter.most_common()[0][0] for counter in data_count])
-    least_common_bit_string = "".join([counter.most_common()[-1][0] for counter in data_count])
-    most_common_int = int(most_common_bit_string, 2)
-    least_common_int = int(least_common_bit_string, 2)
-    print(f"Part 1: {most_common_int * least_common_int} (t: {1000*(time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    p2_most_common_str = filter_out_string(data, most_common=True)
-    p2_least_common_str = filter_out_string(data, most_common=False)
-    p2_most_common_int = int(p2_most_common_str, 2)
-    p2_least_common_int = int(p2_least_common_str, 2)
-    print(f"Part 2: {p2_most_common_int * p2_least_common_int} (t: {1000*(time.perf_counter() - t):.3f} ms)")
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part 1: {solve_p1(data)}")
+    print(f"Part 2: {solve_p2(data)}")
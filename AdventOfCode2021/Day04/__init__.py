@@ -1,5 +1,6 @@
-import time
-from typing import Sequence, List, Tuple, Optional
+import os
+from collections import defaultdict
+from typing import Sequence, List, Tuple, Optional, Iterable, Iterator, NamedTuple, Any
 
 
 class Board:
@@ -51,7 +52,7 @@ def load_case(path: str) -> Tuple[List[int], List[Board]]:
         _ = f.readline()
         board_numbers = []
         boards = []
-        for line in f.readlines():
+        for line in f:
             if not line.strip():
                 boards.append(Board(board_numbers))
                 board_numbers = []
@@ -81,26 +82,145 @@ def get_last_winning_board(numbers: List[int], boards: List[Board]) -> Optional[
                     return board
 
 
+class BingoEngine:
+    """
+    Plays all the boards at once.
+    Every number points to the cells holding it, and every board keeps hit counters of its rows and columns,
+    so a draw only touches boards containing that number and a win is detected by a single comparison.
+    """
+
+    def __init__(self, boards: Sequence[Board]):
+        self.boards = list(boards)
+        # number -> [(board index, row, column)], in order of boards
+        self._cells = defaultdict(list)
+        for i, board in enumerate(self.boards):
+            for cell, number in enumerate(board.numbers):
+                row, column = divmod(cell, board.n)
+                self._cells[number].append((i, row, column))
+        self._row_hits = [[0] * board.n for board in self.boards]
+        self._column_hits = [[0] * board.n for board in self.boards]
+        self._unmarked_sums = [sum(board.numbers) for board in self.boards]
+        self._drawn = set()
+        self.won = [False] * len(self.boards)
+        # (board index, score) in order of winning
+        self.winners: List[Tuple[int, int]] = []
+
+    def draw(self, number: int) -> List[Tuple[int, int]]:
+        """Marks the number and returns boards which won with it, as (board index, score)."""
+        if number in self._drawn:
+            return []
+        self._drawn.add(number)
+        new_winners = []
+        for i, row, column in self._cells.get(number, ()):
+            # Boards which already won are out of the game
+            if self.won[i]:
+                continue
+            self._unmarked_sums[i] -= number
+            row_hits, column_hits = self._row_hits[i], self._column_hits[i]
+            row_hits[row] += 1
+            column_hits[column] += 1
+            n = self.boards[i].n
+            if row_hits[row] == n or column_hits[column] == n:
+                self.won[i] = True
+                new_winners.append((i, number * self._unmarked_sums[i]))
+        self.winners.extend(new_winners)
+        return new_winners
+
+    def play(self, numbers: Iterable[int]) -> Iterator[Tuple[int, int]]:
+        """Yields (board index, score) as boards win."""
+        for number in numbers:
+            yield from self.draw(number)
+
+
+class BoardRanking(NamedTuple):
+    # Arrays ordered by winning time: board indexes, index of the winning draw and score
+    boards: Any
+    win_draws: Any
+    scores: Any
+
+
+def rank_boards(numbers: Sequence[int], boards: Sequence[Board]) -> BoardRanking:
+    """
+    Finds winning order of all the boards at once, instead of simulating draws one by one.
+    Every cell is mapped to the index at which its number gets drawn, a line is complete at the maximum
+    of its cells, and a board wins with the first complete line: minimum over its rows and columns.
+    Boards that never win are left out.
+    """
+    # Lazy, the solvers don't need numpy (see README)
+    import numpy as np
+
+    n = boards[0].n
+    if any(board.n != n for board in boards):
+        raise ValueError("All boards must have the same size")
+    stack = np.array([board.numbers for board in boards]).reshape(len(boards), n, n)
+    numbers = np.asarray(numbers, dtype=np.int64)
+    never = numbers.size
+    # Values are mapped to their position among all distinct values, so their size and sign don't matter
+    values = np.unique(np.concatenate((stack.ravel(), numbers)))
+    draw_index = np.full(values.size, never)
+    # Only the first draw of a number matters
+    unique_numbers, first_draws = np.unique(numbers, return_index=True)
+    draw_index[np.searchsorted(values, unique_numbers)] = first_draws
+    cell_draws = draw_index[np.searchsorted(values, stack)]
+    win_draws = np.minimum(cell_draws.max(axis=2).min(axis=1), cell_draws.max(axis=1).min(axis=1))
+    # Stable sort keeps boards winning with the same draw in their original order
+    order = np.argsort(win_draws, kind="stable")
+    order = order[win_draws[order] < never]
+    win_draws = win_draws[order]
+    unmarked = cell_draws[order] > win_draws[:, None, None]
+    unmarked_sums = np.where(unmarked, stack[order], 0).sum(axis=(1, 2))
+    return BoardRanking(boards=order, win_draws=win_draws, scores=unmarked_sums * numbers[win_draws])
+
+
+def solve_p1(case: Tuple[List[int], List[Board]]) -> int:
+    numbers, boards = case
+    winner = next(BingoEngine(boards).play(numbers), None)
+    if winner is None:
+        raise ValueError("No board wins")
+    _, score = winner
+    return score
+
+
+def solve_p2(case: Tuple[List[int], List[Board]]) -> int:
+    numbers, boards = case
+    engine = BingoEngine(boards)
+    for _ in engine.play(numbers):
+        pass
+    if not engine.winners:
+        raise ValueError("No board wins")
+    _, score = engine.winners[-1]
+    return score
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test Case
     expected_result_1 = 188 * 24
-    test_numbers, test_boards = load_case("test.txt")
+    test_numbers, test_boards = load_case(os.path.join(here, "test.txt"))
     winning_board = get_first_winning_board(test_numbers, test_boards)
     assert expected_result_1 == winning_board.score
 
     expected_result_2 = 148 * 13
-    test_numbers, test_boards = load_case("test.txt")
+    test_numbers, test_boards = load_case(os.path.join(here, "test.txt"))
     last_board = get_last_winning_board(test_numbers, test_boards)
     assert expected_result_2 == last_board.score
-
-    # Part 1
-    numbers, boards = load_case("data.txt")
-    t = time.perf_counter()
-    winning_board = get_first_winning_board(numbers, boards)
-    print(f"Part 1: {winning_board.score} (t: {1000*(time.perf_counter() - t):.3f} ms)")
-
-    # Part 1
-    numbers, boards = load_case("data.txt")
-    t = time.perf_counter()
-    last_board = get_last_winning_board(numbers, boards)
-    print(f"Part 2: {last_board.score} (t: {1000*(time.perf_counter() - t):.3f} ms)")
+    test_case = load_case(os.path.join(here, "test.txt"))
+    assert solve_p1(test_case) == expected_result_1
+    assert solve_p2(test_case) == expected_result_2
+    for solver in (solve_p1, solve_p2):
+        try:
+            solver((test_case[0][:4], test_case[1]))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("No board can win after 4 draws")
+    test_ranking = rank_boards(*test_case)
+    test_board = Board(n=2, numbers=[-5, 10 ** 15, 3, -1])
+    assert rank_boards([3, 10 ** 15, -5], [test_board]).scores.tolist() == [-5 * -1]
+    assert test_ranking.scores[0] == expected_result_1 and test_ranking.scores[-1] == expected_result_2, test_ranking
+
+    case = load_case(os.path.join(here, "data.txt"))
+    ranking = rank_boards(*case)
+    assert [ranking.scores[0], ranking.scores[-1]] == [solve_p1(case), solve_p2(case)]
+    print(f"Part 1: {solve_p1(case)}")
+    print(f"Part 2: {solve_p2(case)}")
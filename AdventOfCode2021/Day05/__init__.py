@@ -1,7 +1,10 @@
 import dataclasses
-import time
+import os
+from bisect import bisect_left, insort
 from collections import Counter
-from typing import Optional, List
+from typing import Optional, List, Tuple
+
+import numpy as np
 
 
 @dataclasses.dataclass(frozen=True)
@@ -66,29 +69,242 @@ def get_pipe(pipeline: str) -> Optional[Pipe]:
 def load_case(path: str) -> List[Pipe]:
     pipes = []
     with open(path, "r") as f:
-        for line in f.readlines():
+        for line in f:
             pipe = get_pipe(line.strip())
             if pipe:
                 pipes.append(pipe)
     return pipes
 
 
+def count_overlaps(pipes: List[Pipe], include_diagonal: bool = False) -> int:
+    c = Counter(point for pipe in pipes for point in pipe.list_points(include_diagonal=include_diagonal))
+    return sum(1 for value in c.values() if value > 1)
+
+
+def pipes_to_array(pipes: List[Pipe]) -> np.ndarray:
+    # One row of x0, y0, x1, y1 per pipe
+    return np.array([(p.p0.x, p.p0.y, p.p1.x, p.p1.y) for p in pipes], dtype=np.int64).reshape(-1, 4)
+
+
+def select_lines(ends: np.ndarray, include_diagonal: bool = False) -> np.ndarray:
+    # Same as Pipe.list_points: horizontal and vertical pipes always, 45 degrees ones only if asked for
+    dx = ends[:, 2] - ends[:, 0]
+    dy = ends[:, 3] - ends[:, 1]
+    keep = (dx == 0) | (dy == 0)
+    if include_diagonal:
+        keep |= np.abs(dx) == np.abs(dy)
+    return ends[keep]
+
+
+def rasterize(pipes: List[Pipe], include_diagonal: bool = False) -> np.ndarray:
+    """
+    Returns a grid with the number of pipes covering each point, indexed by [y - min y, x - min x].
+    All the covered cells are generated at once: every pipe is repeated as many times as it has points,
+    and each repetition gets moved by its offset along the pipe.
+    """
+    ends = select_lines(pipes_to_array(pipes), include_diagonal=include_diagonal)
+    if not ends.size:
+        return np.zeros((0, 0), dtype=np.int64)
+    x0, y0, x1, y1 = ends.T
+    lengths = np.maximum(np.abs(x1 - x0), np.abs(y1 - y0)) + 1
+    pipe_index = np.repeat(np.arange(lengths.size), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    xs = x0[pipe_index] + np.sign(x1 - x0)[pipe_index] * offsets
+    ys = y0[pipe_index] + np.sign(y1 - y0)[pipe_index] * offsets
+    min_x, min_y = min(x0.min(), x1.min()), min(y0.min(), y1.min())
+    width = max(x0.max(), x1.max()) - min_x + 1
+    height = max(y0.max(), y1.max()) - min_y + 1
+    counts = np.bincount((ys - min_y) * width + (xs - min_x), minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def count_overlaps_grid(pipes: List[Pipe], include_diagonal: bool = False) -> int:
+    return int(np.count_nonzero(rasterize(pipes, include_diagonal=include_diagonal) > 1))
+
+
+# Line families as A * x + B * y = key, every pipe lies on exactly one such line
+HORIZONTAL, VERTICAL, RISING, FALLING = range(4)
+LINE_COEFFICIENTS = np.array([(0, 1), (1, 0), (-1, 1), (1, 1)], dtype=np.int64)
+
+
+def _line_families(ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Returns family, key and the range [lo, hi] of a parameter along the line:
+    # y for vertical pipes and x for all the others
+    x0, y0, x1, y1 = ends.T
+    family = np.full(x0.size, HORIZONTAL)
+    family[(x0 == x1) & (y0 != y1)] = VERTICAL
+    family[(x1 - x0 == y1 - y0) & (x0 != x1)] = RISING
+    family[(x1 - x0 == y0 - y1) & (x0 != x1)] = FALLING
+    a, b = LINE_COEFFICIENTS[family].T
+    key = a * x0 + b * y0
+    is_vertical = family == VERTICAL
+    lo = np.where(is_vertical, np.minimum(y0, y1), np.minimum(x0, x1))
+    hi = np.where(is_vertical, np.maximum(y0, y1), np.maximum(x0, x1))
+    return family, key, lo, hi
+
+
+def _collinear_overlaps(keys: np.ndarray, los: np.ndarray, his: np.ndarray) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Sweeps pipes of one family, sorted by line and start, and returns disjoint ranges covered at least twice.
+    A new pipe overlaps whatever was covered so far up to the furthest end seen on the same line.
+    """
+    order = np.lexsort((los, keys))
+    overlap_keys, overlap_los, overlap_his = [], [], []
+    current_key, reach = None, None
+    for key, lo, hi in zip(keys[order].tolist(), los[order].tolist(), his[order].tolist()):
+        if key != current_key:
+            current_key, reach = key, hi
+            continue
+        if lo <= reach:
+            end = min(hi, reach)
+            # Overlaps come sorted by start, so they only need to be merged with the last one
+            if overlap_keys and overlap_keys[-1] == key and lo <= overlap_his[-1] + 1:
+                overlap_his[-1] = max(overlap_his[-1], end)
+            else:
+                overlap_keys.append(key)
+                overlap_los.append(lo)
+                overlap_his.append(end)
+        reach = max(reach, hi)
+    return overlap_keys, overlap_los, overlap_his
+
+
+def _orthogonal_intersections(
+        h_keys: np.ndarray, h_los: np.ndarray, h_his: np.ndarray,
+        v_keys: np.ndarray, v_los: np.ndarray, v_his: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns index pairs of intersecting horizontal segments (y = h_key, h_lo <= x <= h_hi)
+    and vertical ones (x = v_key, v_lo <= y <= v_hi).
+    Sweeps along y: a vertical segment is active between its ends, kept in a list sorted by x,
+    and a horizontal one only looks up the active segments within its own x span.
+    Disjoint pairs are never formed, so the work grows with the number of segments and intersections.
+    """
+    n = v_keys.size
+    # Active segments are sorted by x, ties broken by index: x * n + index
+    codes = [x * n + j for j, x in enumerate(v_keys.tolist())]
+    insert, query, remove = 0, 1, 2
+    ys = np.concatenate((v_los, h_keys, v_his))
+    kinds = np.repeat(np.array([insert, query, remove]), (n, h_keys.size, n))
+    indices = np.concatenate((np.arange(n), np.arange(h_keys.size), np.arange(n)))
+    # Segments touching at an end intersect, so at the same y inserts go first and removals last
+    order = np.lexsort((kinds, ys))
+    h_los, h_his = h_los.tolist(), h_his.tolist()
+    active = []
+    found_h, found_v = [], []
+    for kind, i in zip(kinds[order].tolist(), indices[order].tolist()):
+        if kind == insert:
+            insort(active, codes[i])
+        elif kind == remove:
+            del active[bisect_left(active, codes[i])]
+        else:
+            found = active[bisect_left(active, h_los[i] * n):bisect_left(active, (h_his[i] + 1) * n)]
+            found_h.extend([i] * len(found))
+            found_v.extend(found)
+    return np.array(found_h, dtype=np.int64), np.array(found_v, dtype=np.int64) % max(n, 1)
+
+
+def _crossings(family: np.ndarray, key: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns unique points where pipes of different families cross, as (x, y) rows.
+    For a pair of families, a line of the other family crosses a pipe iff its key is between the keys
+    of that family's lines through the pipe's ends. So in (key of the other family, own key) coordinates
+    every pipe of one family becomes a horizontal segment, every pipe of the other a vertical one,
+    and crossing pipes are intersecting segments, found with a sweep line.
+    """
+    x0, y0, x1, y1 = ends.T
+    points = []
+    for f in range(4):
+        for g in range(f + 1, 4):
+            i, j = np.flatnonzero(family == f), np.flatnonzero(family == g)
+            if not i.size or not j.size:
+                continue
+            (a_f, b_f), (a_g, b_g) = LINE_COEFFICIENTS[f].tolist(), LINE_COEFFICIENTS[g].tolist()
+            g_keys = (a_g * x0[i] + b_g * y0[i], a_g * x1[i] + b_g * y1[i])
+            f_keys = (a_f * x0[j] + b_f * y0[j], a_f * x1[j] + b_f * y1[j])
+            pi, pj = _orthogonal_intersections(
+                key[i], np.minimum(*g_keys), np.maximum(*g_keys),
+                key[j], np.minimum(*f_keys), np.maximum(*f_keys),
+            )
+            k_f, k_g = key[i[pi]], key[j[pj]]
+            # Cramer's rule
+            det = a_f * b_g - a_g * b_f
+            x_num = k_f * b_g - k_g * b_f
+            y_num = a_f * k_g - a_g * k_f
+            # Rising and falling lines can cross between grid points
+            on_grid = (x_num % det == 0) & (y_num % det == 0)
+            points.append(np.stack((x_num[on_grid] // det, y_num[on_grid] // det), axis=1))
+    if not points:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(points), axis=0)
+
+
+def _in_overlaps(keys: np.ndarray, params: np.ndarray, overlaps: Tuple[List[int], List[int], List[int]]) -> np.ndarray:
+    # Checks which (key, param) points lie in one of the ranges covered at least twice
+    overlap_keys, overlap_los, overlap_his = (np.array(o, dtype=np.int64) for o in overlaps)
+    if not overlap_keys.size:
+        return np.zeros(keys.size, dtype=bool)
+    # Ranges are sorted by key and start, flatten both into one sortable number
+    key_min = min(overlap_keys.min(), keys.min())
+    param_min = min(overlap_los.min(), params.min())
+    span = max(overlap_his.max(), params.max()) - param_min + 1
+    index = np.searchsorted((overlap_keys - key_min) * span + overlap_los - param_min,
+                            (keys - key_min) * span + params - param_min, side="right") - 1
+    found = index >= 0
+    index = np.maximum(index, 0)
+    return found & (overlap_keys[index] == keys) & (overlap_his[index] >= params)
+
+
+def count_overlaps_sparse(pipes: List[Pipe], include_diagonal: bool = False) -> int:
+    """
+    Counts points covered by at least two pipes without rasterizing, for huge coordinate spaces.
+    Such points are either within collinear overlaps (found with a sweep over every line family),
+    or crossings of pipes from different families (found with a sweep line for every pair of families).
+    A crossing can also lie in collinear overlaps of several families, so those are corrected for
+    to count every point exactly once. Time and memory grow with the number of pipes and crossings
+    (up to the sorting), not with the area, the covered cells or the number of pipe pairs.
+    """
+    ends = select_lines(pipes_to_array(pipes), include_diagonal=include_diagonal)
+    if not ends.size:
+        return 0
+    family, key, lo, hi = _line_families(ends)
+    overlaps = [_collinear_overlaps(key[family == f], lo[family == f], hi[family == f]) for f in range(4)]
+    total = sum(h - l + 1 for _, los, his in overlaps for l, h in zip(los, his))
+
+    crossings = _crossings(family, key, ends)
+    if crossings.size:
+        x, y = crossings.T
+        # Key and parameter of every crossing in each family's terms, same as in _line_families
+        in_families = sum(
+            _in_overlaps(a * x + b * y, y if f == VERTICAL else x, overlaps[f]).astype(np.int64)
+            for f, (a, b) in enumerate(LINE_COEFFICIENTS)
+        )
+        # Crossing outside of any overlap adds one point, while one in k overlaps was already counted k times
+        total += int(np.sum(1 - in_families))
+    return total
+
+
+def solve_p1(pipes: List[Pipe]) -> int:
+    return count_overlaps_grid(pipes, include_diagonal=False)
+
+
+def solve_p2(pipes: List[Pipe]) -> int:
+    return count_overlaps_grid(pipes, include_diagonal=True)
+
+
 if __name__ == '__main__':
-    test_pipes = load_case("test.txt")
+    here = os.path.dirname(os.path.abspath(__file__))
+    test_pipes = load_case(os.path.join(here, "test.txt"))
     c_test1 = Counter(point for pipe in test_pipes for point in pipe.list_points(include_diagonal=False))
     c_test2 = Counter(point for pipe in test_pipes for point in pipe.list_points(include_diagonal=True))
     assert sum(1 for value in c_test1.values() if value > 1) == 5
     assert sum(1 for value in c_test2.values() if value > 1) == 12
+    assert solve_p1(test_pipes) == 5
+    assert solve_p2(test_pipes) == 12
+    assert count_overlaps_sparse(test_pipes, include_diagonal=False) == 5
+    assert count_overlaps_sparse(test_pipes, include_diagonal=True) == 12
 
-    pipes = load_case("data.txt")
-    t = time.perf_counter()
-    c_p1 = Counter(point for pipe in pipes for point in pipe.list_points(include_diagonal=False))
-    result_p1 = sum(1 for value in c_p1.values() if value > 1)
-    print(f"Part1: {result_p1:>8} (t: {1000*(time.perf_counter() - t):.3f} ms)")
-
-
-    pipes = load_case("data.txt")
-    t = time.perf_counter()
-    c_p2 = Counter(point for pipe in pipes for point in pipe.list_points(include_diagonal=True))
-    result_p2 = sum(1 for value in c_p2.values() if value > 1)
-    print(f"Part2: {result_p2:>8} (t: {1000*(time.perf_counter() - t):.3f} ms)")
+    pipes = load_case(os.path.join(here, "data.txt"))
+    assert count_overlaps(pipes, include_diagonal=True) == solve_p2(pipes)
+    assert count_overlaps_sparse(pipes, include_diagonal=True) == solve_p2(pipes)
+    print(f"Part1: {solve_p1(pipes):>8}")
+    print(f"Part2: {solve_p2(pipes):>8}")
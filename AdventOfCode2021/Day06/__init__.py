@@ -1,10 +1,66 @@
-import time
-from typing import List
+import json
+import os
+from typing import List, Iterable, Dict, Sequence, Optional
+
+Matrix = List[List[int]]
+
+
+def _multiply(a: Matrix, b: Matrix) -> Matrix:
+    # Plain Python ints, so populations are exact no matter how big they get
+    columns = list(zip(*b))
+    return [[sum(x * y for x, y in zip(row, column)) for column in columns] for row in a]
+
+
+class GrowthModel:
+    """
+    One day of a school as a transition matrix over fish ages, so any number of days is a matrix power.
+    Populations come from a growth vector: ones times the matrix power, i.e. how many fishes a single fish
+    of each age turns into. Matrix powers of two are cached, so every query takes O(log days) products.
+    """
+
+    def __init__(self, reset_age: int = 6, newborn_age: int = 8):
+        if not 0 <= reset_age <= newborn_age:
+            raise ValueError(f"Expected 0 <= reset_age <= newborn_age, got {reset_age} and {newborn_age}")
+        self.reset_age = reset_age
+        self.newborn_age = newborn_age
+        self.size = newborn_age + 1
+        # matrix[new age][old age]: everybody gets a day older, while fishes at 0 reset and give birth
+        matrix = [[0] * self.size for _ in range(self.size)]
+        for age in range(1, self.size):
+            matrix[age - 1][age] = 1
+        matrix[reset_age][0] += 1
+        matrix[newborn_age][0] += 1
+        self.matrix = matrix
+        self._powers_of_two = [matrix]
+
+    def _power_of_two(self, exponent: int) -> Matrix:
+        while len(self._powers_of_two) <= exponent:
+            self._powers_of_two.append(_multiply(self._powers_of_two[-1], self._powers_of_two[-1]))
+        return self._powers_of_two[exponent]
+
+    def growth_vector(self, days: int) -> List[int]:
+        if days < 0:
+            raise ValueError(f"Number of days can't be negative, got {days}")
+        row = [[1] * self.size]
+        exponent = 0
+        while days:
+            if days & 1:
+                row = _multiply(row, self._power_of_two(exponent))
+            days >>= 1
+            exponent += 1
+        return row[0]
+
+    def population(self, fishes_by_age: List[int], days: int) -> int:
+        return sum(g * n for g, n in zip(self.growth_vector(days), fishes_by_age))
+
+    def populations(self, fishes_by_age: List[int], days: Iterable[int]) -> List[int]:
+        return [self.population(fishes_by_age, d) for d in days]
 
 
 class Sea:
-    def __init__(self, fishes: List[int]):
-        self.fishes_by_age = [0] * 9
+    def __init__(self, fishes: List[int], model: GrowthModel = None):
+        self.model = model if model else GrowthModel()
+        self.fishes_by_age = [0] * self.model.size
 
         for age in fishes:
             self.fishes_by_age[age] += 1
@@ -21,28 +77,116 @@ class Sea:
             self.fishes_by_age.append(ready_fishes)
             # additionally we must update number of fishes that require 6 more days grow
             # with number of fishes that just gave a birth
-            self.fishes_by_age[6] += ready_fishes
+            self.fishes_by_age[self.model.reset_age] += ready_fishes
         return sum(self.fishes_by_age)
 
+    def count_fishes(self, days: int) -> int:
+        # Unlike simulate_days, doesn't change the sea
+        return self.model.population(self.fishes_by_age, days)
+
+    def count_fishes_batch(self, days: Iterable[int]) -> List[int]:
+        return self.model.populations(self.fishes_by_age, days)
+
+
+class GrowthTable:
+    """
+    Growth vectors of a model for fixed horizons, optionally persisted in a JSON file.
+    A population after a horizon is then just the school's age histogram dotted with the horizon's vector,
+    so scoring many schools against the same horizons never simulates anything.
+    """
+
+    def __init__(self, model: GrowthModel = None, horizons: Iterable[int] = (), path: Optional[str] = None):
+        self.model = model if model else GrowthModel()
+        self.path = path
+        self.vectors: Dict[int, List[int]] = {}
+        if path and os.path.exists(path):
+            self._load(path)
+        missing = [days for days in horizons if days not in self.vectors]
+        for days in missing:
+            self.vectors[days] = self.model.growth_vector(days)
+        if missing and path:
+            self.save()
+
+    def _load(self, path: str) -> None:
+        with open(path, "r") as f:
+            stored = json.load(f)
+        # Vectors of a different model are useless, they will be recomputed and overwritten
+        if (stored["reset_age"], stored["newborn_age"]) != (self.model.reset_age, self.model.newborn_age):
+            return
+        self.vectors = {int(days): vector for days, vector in stored["vectors"].items()}
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path if path else self.path
+        if not path:
+            raise ValueError("No path to save the growth table to")
+        stored = {
+            "reset_age": self.model.reset_age,
+            "newborn_age": self.model.newborn_age,
+            "vectors": {str(days): vector for days, vector in sorted(self.vectors.items())},
+        }
+        # Write to a temporary file first, so a crash never leaves a broken table behind
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(stored, f, separators=(",", ":"))
+        os.replace(f"{path}.tmp", path)
+
+    def vector(self, days: int) -> List[int]:
+        if days not in self.vectors:
+            self.vectors[days] = self.model.growth_vector(days)
+        return self.vectors[days]
+
+    def histogram(self, fishes: Sequence[int]) -> List[int]:
+        histogram = [0] * self.model.size
+        for age in fishes:
+            if not 0 <= age < self.model.size:
+                raise ValueError(f"Fish ages must be between 0 and {self.model.size - 1}")
+            histogram[age] += 1
+        return histogram
+
+    def population(self, fishes: Sequence[int], days: int) -> int:
+        return sum(g * n for g, n in zip(self.vector(days), self.histogram(fishes)))
+
+    def populations(self, schools: Iterable[Sequence[int]], days: int) -> List[int]:
+        vector = self.vector(days)
+        return [sum(g * n for g, n in zip(vector, self.histogram(fishes))) for fishes in schools]
+
+
+def load_case(path: str) -> List[int]:
+    # A single short line, numpy based loaders would only slow down the import
+    with open(path, "r") as f:
+        return [int(i) for i in f.readline().strip().split(",")]
+
+
+def solve_p1(fishes: List[int]) -> int:
+    return Sea(fishes).count_fishes(80)
+
+
+def solve_p2(fishes: List[int]) -> int:
+    return Sea(fishes).count_fishes(256)
+
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
     test_initial_state = [3, 4, 3, 1, 2]
     test_sea = Sea(fishes=test_initial_state)
     assert test_sea.simulate_days(80) == 5934
     test_sea = Sea(fishes=test_initial_state)
     assert test_sea.simulate_days(256) == 26984457539
+    test_sea = Sea(fishes=test_initial_state)
+    assert test_sea.count_fishes_batch([18, 80, 256]) == [26, 5934, 26984457539]
+    assert Sea(fishes=test_initial_state, model=GrowthModel(reset_age=6, newborn_age=8)).count_fishes(0) == 5
+    test_model = GrowthModel(reset_age=3, newborn_age=5)
+    assert Sea([1, 2], model=test_model).simulate_days(50) == Sea([1, 2], model=test_model).count_fishes(50)
+
+    test_table = GrowthTable(horizons=(80, 256))
+    assert test_table.populations([test_initial_state, [3]], 80) == [5934, Sea([3]).simulate_days(80)]
+    try:
+        test_table.save()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("A table without a path can't be saved")
 
-    with open("data.txt", "r") as f:
-        initial_state = [int(i) for i in f.readline().strip().split(",")]
-    # Part 1
-    data_sea = Sea(initial_state)
-    t = time.perf_counter()
-    result_p1 = data_sea.simulate_days(80)
-    print(f"Part1: {result_p1:>15} (t: {1000*(time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    data_sea = Sea(initial_state)
-    t = time.perf_counter()
-    result_p2 = data_sea.simulate_days(256)
-    print(f"Part2: {result_p2:>15} (t: {1000*(time.perf_counter() - t):.3f} ms)")
+    initial_state = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(initial_state):>15}")
+    print(f"Part2: {solve_p2(initial_state):>15}")
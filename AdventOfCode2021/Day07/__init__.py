@@ -1,10 +1,16 @@
-import time
-from typing import List, Callable
+import math
+import os
+from typing import List, Callable, Tuple, Sequence
+
+import numpy as np
+
+from AdventOfCode2021.loaders import load_ints
+
+INT64_MAX = int(np.iinfo(np.int64).max)
 
 
 def load_case(path: str) -> List[int]:
-    with open(path, "r") as f:
-        return [int(x) for x in f.readline().split(",")]
+    return load_ints(path).tolist()
 
 
 def distance_p1(x, y):
@@ -53,20 +59,112 @@ def find_closest_point(numbers: List, distance_func: Callable):
             return left_distance, left_point
 
 
+class FuelOptimizer:
+    """
+    Total fuel needed to move all crabs to any point, without looking at every crab.
+    Positions are sorted once, so with c crabs at or left of point t, and s being the sum of their positions:
+        sum of |t - p|        = t * c - s + (S - s) - t * (n - c)
+        sum of (t - p) ** 2   = n * t ** 2 - 2 * t * S + Q
+    where S and Q are the sums of all positions and their squares.
+    Triangular cost (distance_p2) is half of the sum of both, since n * (n + 1) / 2 = (n ** 2 + n) / 2.
+    Finding c is a binary search, so every cost takes O(log n).
+    Sums are exact: numpy int64 is only used where the bounds show it can't overflow, Python ints otherwise.
+    """
+
+    def __init__(self, numbers: Sequence[int]):
+        self.positions = np.sort(np.asarray(numbers, dtype=np.int64))
+        if not self.positions.size:
+            raise ValueError("There are no crabs")
+        self.n = int(self.positions.size)
+        self.largest = max(abs(int(self.positions[0])), abs(int(self.positions[-1])))
+        positions = self.positions if self.n * self.largest <= INT64_MAX else self.positions.astype(object)
+        self.prefix_sums = np.concatenate(([0], np.cumsum(positions)))
+        self.total = int(self.prefix_sums[-1])
+        if self.n * self.largest ** 2 <= INT64_MAX:
+            self.total_squares = int(np.dot(self.positions, self.positions))
+        else:
+            self.total_squares = sum(p * p for p in self.positions.tolist())
+
+    def linear_cost(self, point: int) -> int:
+        c = int(np.searchsorted(self.positions, point, side="right"))
+        s = int(self.prefix_sums[c])
+        return point * c - s + (self.total - s) - point * (self.n - c)
+
+    def triangular_cost(self, point: int) -> int:
+        squares = self.n * point * point - 2 * point * self.total + self.total_squares
+        return (squares + self.linear_cost(point)) // 2
+
+    def cost_curve(self, triangular: bool = False, points: np.ndarray = None) -> np.ndarray:
+        """Costs for all points (by default every point between the outermost crabs) at once, e.g. for plotting."""
+        if points is None:
+            points = np.arange(self.positions[0], self.positions[-1] + 1)
+        points = np.asarray(points, dtype=np.int64)
+        c = np.searchsorted(self.positions, points, side="right")
+        s = self.prefix_sums[c]
+        largest = max(self.largest, abs(int(points.min())), abs(int(points.max()))) if points.size else 0
+        # Distances go up to 2 * largest (crab and point on opposite sides of 0), so neither the sum of squares
+        # nor any of its partial sums exceeds n * (2 * largest) ** 2, and the linear cost adds at most n * 2 * largest
+        if self.n * (2 * largest) ** 2 + self.n * 2 * largest > INT64_MAX:
+            points, c, s = points.astype(object), c.astype(object), s.astype(object)
+        linear = points * c - s + (self.total - s) - points * (self.n - c)
+        if not triangular:
+            return linear
+        squares = self.n * points * points - 2 * points * self.total + self.total_squares
+        return (squares + linear) // 2
+
+    def best_linear(self) -> Tuple[int, int]:
+        # Sum of distances is the lowest at the median
+        point = int(self.positions[(self.n - 1) // 2])
+        return self.linear_cost(point), point
+
+    def best_triangular(self) -> Tuple[int, int]:
+        # Sum of squares alone would be the lowest at the mean, and the linear part can't move
+        # the optimum further than by half a point, so only points around the mean need to be checked
+        mean = self.total / self.n
+        candidates = range(math.floor(mean) - 1, math.ceil(mean) + 2)
+        return min((self.triangular_cost(point), point) for point in candidates)
+
+
+def solve_p1(numbers: List[int]) -> int:
+    min_distance, _ = FuelOptimizer(numbers).best_linear()
+    return min_distance
+
+
+def solve_p2(numbers: List[int]) -> int:
+    min_distance, _ = FuelOptimizer(numbers).best_triangular()
+    return min_distance
+
+
 if __name__ == '__main__':
-    test_case = load_case("test.txt")
+    here = os.path.dirname(os.path.abspath(__file__))
+    test_case = load_case(os.path.join(here, "test.txt"))
     min_distance_t1, _ = find_closest_point(test_case, distance_func=distance_p1)
     min_distance_t2, _ = find_closest_point(test_case, distance_func=distance_p2)
     assert min_distance_t1 == 37
     assert min_distance_t2 == 168
-
-    # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    min_distance_p1, best_point_p1 = find_closest_point(data, distance_func=distance_p1)
-    print(f"Part1: {min_distance_p1:>10} (p: {best_point_p1}, t: {1000*(time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    min_distance_p2, best_point_p2 = find_closest_point(data, distance_func=distance_p2)
-    print(f"Part2: {min_distance_p2:>10} (p: {best_point_p2}, t: {1000*(time.perf_counter() - t):.3f} ms)")
+    test_optimizer = FuelOptimizer(test_case)
+    assert test_optimizer.best_linear() == (37, 2)
+    assert test_optimizer.best_triangular() == (168, 5)
+    assert test_optimizer.cost_curve(triangular=True).tolist() == [
+        sum(distance_p2(point, p) for p in test_case) for point in range(min(test_case), max(test_case) + 1)
+    ]
+    test_optimizer = FuelOptimizer([0, 2_000_000_000, 4_000_000_000])
+    assert test_optimizer.best_triangular() == (2 * distance_p2(0, 2_000_000_000), 2_000_000_000)
+    test_points = [-1, 2_000_000_001, 5_000_000_000]
+    assert test_optimizer.cost_curve(triangular=True, points=test_points).tolist() == [
+        sum(distance_p2(point, p) for p in [0, 2_000_000_000, 4_000_000_000]) for point in test_points
+    ]
+    # Mixed signs right around the point where int64 stops being enough
+    for test_largest in (math.isqrt(INT64_MAX // 6) - 2, math.isqrt(INT64_MAX // 12) - 1):
+        test_case = [-test_largest, test_largest, test_largest]
+        test_points = [-test_largest, 0, test_largest]
+        assert FuelOptimizer(test_case).cost_curve(triangular=True, points=test_points).tolist() == [
+            sum(distance_p2(point, p) for p in test_case) for point in test_points
+        ]
+    test_optimizer = FuelOptimizer([0, 4_000_000_000] * 1_000_000)
+    assert test_optimizer.best_triangular() == (2_000_000 * distance_p2(0, 2_000_000_000), 2_000_000_000)
+    assert test_optimizer.best_linear() == (4_000_000_000_000_000, 0)
+
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(data):>10}")
+    print(f"Part2: {solve_p2(data):>10}")
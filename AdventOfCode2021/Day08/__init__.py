@@ -1,9 +1,11 @@
-import time
-from collections import defaultdict
+import os
+from collections import defaultdict, Counter
 from itertools import chain
 from typing import Tuple, List
 
 INITIAL_MAPPING = {2: 1, 3: 7, 4: 4, 7: 8}
+# Segments lit for every digit on a correctly wired display
+DIGIT_SEGMENTS = ["abcefg", "cf", "acdeg", "acdfg", "bcdf", "abdfg", "abdefg", "acf", "abcdefg", "abcdfg"]
 
 
 def count_easy_ones(values):
@@ -55,30 +57,92 @@ def get_correct_output(in_code: str, out_code: str):
     return code
 
 
+def encode_pattern(pattern: str) -> int:
+    # Segment "a" is bit 0, ..., segment "g" is bit 6
+    mask = 0
+    for segment in pattern:
+        mask |= 1 << (ord(segment) - ord("a"))
+    return mask
+
+
+def _segment_counts(masks: List[int]) -> List[int]:
+    # In how many of the patterns every segment is lit
+    return [sum((mask >> segment) & 1 for mask in masks) for segment in range(7)]
+
+
+def _signature(mask: int, counts: List[int]) -> int:
+    return sum(count for segment, count in enumerate(counts) if (mask >> segment) & 1)
+
+
+# Counts of segments among all ten digits don't depend on wiring, so neither does a sum of those counts over the
+# segments of a digit. It happens to be different for every digit, so it identifies digits regardless of wiring.
+_DIGIT_COUNTS = _segment_counts([encode_pattern(p) for p in DIGIT_SEGMENTS])
+SIGNATURES = {_signature(encode_pattern(p), _DIGIT_COUNTS): digit for digit, p in enumerate(DIGIT_SEGMENTS)}
+assert len(SIGNATURES) == 10
+
+
+def decode_output(in_code: List[str], out_code: List[str]) -> int:
+    # Counting characters of all patterns at once gives the segment counts without building any masks
+    counts = Counter("".join(in_code))
+    code = 0
+    for pattern in out_code:
+        code = code * 10 + SIGNATURES[sum(counts[segment] for segment in pattern)]
+    return code
+
+
+def encode_codes(codes: List[Tuple[List[str], List[str]]]):
+    """Encodes display lines into (lines, 10) and (lines, 4) uint8 arrays of segment masks."""
+    # Lazy, the solvers don't need numpy (see README)
+    import numpy as np
+
+    in_masks = np.array([[encode_pattern(p) for p in in_code] for in_code, _ in codes], dtype=np.uint8)
+    out_masks = np.array([[encode_pattern(p) for p in out_code] for _, out_code in codes], dtype=np.uint8)
+    return in_masks.reshape(-1, 10), out_masks.reshape(len(codes), -1)
+
+
+def decode_outputs(in_masks, out_masks):
+    """Vectorized decode_output over arrays of segment masks (see encode_codes), returns output values."""
+    import numpy as np
+
+    segments = np.arange(7, dtype=np.uint8)
+    counts = ((in_masks[:, :, None] >> segments) & 1).sum(axis=1)
+    signatures = np.einsum("lds,ls->ld", (out_masks[:, :, None] >> segments) & 1, counts)
+    lookup = np.full(max(SIGNATURES) + 1, -1, dtype=np.int64)
+    lookup[list(SIGNATURES)] = list(SIGNATURES.values())
+    digits = lookup[signatures]
+    if np.any(digits < 0):
+        raise ValueError("Unable to decode some of the patterns")
+    return digits @ (10 ** np.arange(out_masks.shape[1] - 1, -1, -1))
+
+
 def load_case(path: str) -> List[Tuple[str, str]]:
     output = []
     with open(path, "r") as f:
-        for line in f.readlines():
+        for line in f:
             in_str, out_str = line.strip().split(" | ")
             output.append((in_str.strip().split(), out_str.strip().split()))
     return output
 
 
+def solve_p1(codes: List[Tuple[str, str]]) -> int:
+    return count_easy_ones(chain(*(b for a, b in codes)))
+
+
+def solve_p2(codes: List[Tuple[str, str]]) -> int:
+    return sum((decode_output(*iocode) for iocode in codes))
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_codes = load_case("test.txt")
+    test_codes = load_case(os.path.join(here, "test.txt"))
     test_result_p1 = count_easy_ones(chain(*(b for a, b in test_codes)))
     test_result_p2 = sum((get_correct_output(*c) for c in test_codes))
     assert test_result_p1 == 26
     assert test_result_p2 == 61229
+    assert [decode_output(*c) for c in test_codes] == [get_correct_output(*c) for c in test_codes]
+    assert int(decode_outputs(*encode_codes(test_codes)).sum()) == 61229
 
-    # Part 1
-    codes = load_case("data.txt")
-    t = time.perf_counter()
-    result_p1 = count_easy_ones(chain(*(b for a, b in codes)))
-    print(f"Part1: {result_p1:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    result_p2 = sum((get_correct_output(*iocode) for iocode in codes))
-    print(f"Part2: {result_p2:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    codes = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(codes):>6}")
+    print(f"Part2: {solve_p2(codes):>6}")
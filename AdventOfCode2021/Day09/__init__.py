@@ -1,27 +1,33 @@
-import time
-from typing import List, Tuple
+import heapq
+import os
+from typing import List, Tuple, Union
 from collections import deque
 import numpy as np
 
+from AdventOfCode2021.loaders import load_digit_grid, map_digit_grid, ZERO
+
 
 def load_case(path: str) -> np.ndarray:
-    with open(path, "r") as f:
-        lines = [[int(digit.strip()) for digit in line.strip()] for line in f.readlines()]
-        ar = np.array(lines)
-    return ar
+    return load_digit_grid(path)
 
 
-def find_2d_mins(data: np.ndarray) -> np.ndarray:
-    border_val = 9
-    # add borders with high values
-    bd = np.ones((data.shape[0] + 2, data.shape[1] + 2)) * border_val
-    bd[1:-1, 1:-1] = data
+def _low_points(bd: np.ndarray) -> np.ndarray:
+    # bd has one cell wide border around the data points
+    data = bd[1:-1, 1:-1]
     # if point is smaller then the left right top and bottom point then it is considered a minimum point
     #            LEFT                    RIGHT                  BOTTOM                     TOP
     m = (data < bd[1:-1, :-2]) & (data < bd[1:-1, 2:]) & (data < bd[:-2, 1:-1]) & (data < bd[2:, 1:-1])
     return m
 
 
+def find_2d_mins(data: np.ndarray) -> np.ndarray:
+    border_val = 9
+    # add borders with high values, keeping the dtype so the copy isn't bigger than necessary
+    bd = np.full((data.shape[0] + 2, data.shape[1] + 2), border_val, dtype=data.dtype)
+    bd[1:-1, 1:-1] = data
+    return _low_points(bd)
+
+
 def get_basin_size(data: np.ndarray, point: Tuple[int, int]) -> int:
     minx, miny, maxx, maxy = 0, 0, data.shape[0] - 1, data.shape[1] - 1
     points_to_visit = deque([point])
@@ -49,28 +55,150 @@ def get_basin_size(data: np.ndarray, point: Tuple[int, int]) -> int:
 
 
 def sum_risks(values: List[int]) -> int:
-    return sum(x + 1 for x in values)
+    # Grid values are uint8, so make sure to sum Python ints
+    return sum(int(x) + 1 for x in values)
+
+
+def merge_components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Vectorized union-find: returns the root (smallest member) of every one of n nodes connected by edges a-b.
+    Roots of both ends of every edge get hooked to the smaller one, then pointers jump straight to roots,
+    until all edges connect nodes of the same root.
+    """
+    parent = np.arange(n)
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        if np.array_equal(root_a, root_b):
+            return parent
+        lower = np.minimum(root_a, root_b)
+        np.minimum.at(parent, root_a, lower)
+        np.minimum.at(parent, root_b, lower)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def label_basins(data: np.ndarray, return_labels: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Finds all basins (areas separated by 9s) in a single sweep and returns their sizes,
+    and optionally an image with labels 1..number of basins (0 for 9s).
+    Horizontal runs of basin cells are labeled first, then runs touching vertically are merged with union-find,
+    so Python never looks at single cells.
+    """
+    mask = data < 9
+    # Runs start at basin cells without a basin cell to their left
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    run_ids = (np.cumsum(starts, dtype=np.int32) - 1).reshape(mask.shape)
+    no_of_runs = int(np.count_nonzero(starts))
+    if not no_of_runs:
+        sizes = np.zeros(0, dtype=np.int64)
+        return (sizes, np.zeros(mask.shape, dtype=np.int32)) if return_labels else sizes
+    run_lengths = np.bincount(run_ids[mask], minlength=no_of_runs)
+    # Runs touch where basin cells are above each other, but one pair of runs is enough to know
+    # so skip cells where neither of the runs changed since the left neighbour
+    touching = mask[:-1] & mask[1:]
+    first_touch = touching.copy()
+    first_touch[:, 1:] &= ~touching[:, :-1] | starts[:-1, 1:] | starts[1:, 1:]
+    roots = merge_components(no_of_runs, run_ids[:-1][first_touch], run_ids[1:][first_touch])
+    _, basin_of_run = np.unique(roots, return_inverse=True)
+    sizes = np.bincount(basin_of_run, weights=run_lengths).astype(np.int64)
+    if not return_labels:
+        return sizes
+    labels = np.where(mask, basin_of_run[run_ids].astype(np.int32) + 1, 0)
+    return sizes, labels
+
+
+def largest_basins(data: np.ndarray, k: int = 3) -> List[int]:
+    return heapq.nlargest(k, label_basins(data).tolist())
+
+
+def open_heightmap(path: str) -> np.ndarray:
+    # Memory-mapped ASCII digits, nothing is read until a tile is accessed (use with offset=ZERO)
+    return map_digit_grid(path)
+
+
+def process_tiles(heightmap: np.ndarray, tile_size: int = 1024, offset: int = 0) -> Tuple[int, np.ndarray]:
+    """
+    Returns the risk sum and all basin sizes of a heightmap which doesn't have to fit into memory
+    (e.g. np.memmap of uint8 values, or open_heightmap with offset=ZERO for raw ASCII digits).
+    Tiles are read with one cell of halo, so low points are exact. Basins are labeled per tile,
+    and parts of a basin in neighbouring tiles are merged at the end, so sizes are exact as well.
+    Only a single tile, the labels of the last row and column of tiles, and the basin parts are kept in memory.
+    """
+    rows, columns = heightmap.shape
+    risk_sum = 0
+    part_sizes = []
+    edges_a, edges_b = [], []
+    # Global basin part ids along the bottom edge of the previous row of tiles (-1 for 9s)
+    bottom_ids = np.full(columns, -1, dtype=np.int64)
+    for r0 in range(0, rows, tile_size):
+        r1 = min(rows, r0 + tile_size)
+        right_ids = None
+        for c0 in range(0, columns, tile_size):
+            c1 = min(columns, c0 + tile_size)
+            # Tile with a halo, where there is no neighbour a border of 9s
+            bd = np.full((r1 - r0 + 2, c1 - c0 + 2), 9, dtype=np.uint8)
+            h0, h1, w0, w1 = max(0, r0 - 1), min(rows, r1 + 1), max(0, c0 - 1), min(columns, c1 + 1)
+            bd[h0 - r0 + 1:h1 - r0 + 1, w0 - c0 + 1:w1 - c0 + 1] = np.subtract(
+                heightmap[h0:h1, w0:w1], offset, dtype=np.uint8)
+            tile = bd[1:-1, 1:-1]
+            low_values = tile[_low_points(bd)]
+            risk_sum += int(low_values.sum(dtype=np.int64)) + low_values.size
+
+            sizes, labels = label_basins(tile, return_labels=True)
+            ids = np.where(labels > 0, labels.astype(np.int64) + (len(part_sizes) - 1), -1)
+            part_sizes.extend(sizes.tolist())
+            # Connect with the tile above and the one on the left
+            for neighbour, edge in ((bottom_ids[c0:c1], ids[0]), (right_ids, ids[:, 0])):
+                if neighbour is None:
+                    continue
+                both = (neighbour >= 0) & (edge >= 0)
+                edges_a.append(neighbour[both])
+                edges_b.append(edge[both])
+            bottom_ids[c0:c1] = ids[-1]
+            right_ids = ids[:, -1]
+
+    if not part_sizes:
+        return risk_sum, np.zeros(0, dtype=np.int64)
+    a = np.concatenate(edges_a) if edges_a else np.zeros(0, dtype=np.int64)
+    b = np.concatenate(edges_b) if edges_b else np.zeros(0, dtype=np.int64)
+    roots = merge_components(len(part_sizes), a, b)
+    _, basin_of_part = np.unique(roots, return_inverse=True)
+    return risk_sum, np.bincount(basin_of_part, weights=part_sizes).astype(np.int64)
+
+
+def solve_p1(data: np.ndarray) -> int:
+    return sum_risks(data[find_2d_mins(data)])
+
+
+def solve_p2(data: np.ndarray) -> int:
+    a, b, c = largest_basins(data, k=3)
+    return a * b * c
 
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_data = load_case("test.txt")
+    test_data = load_case(os.path.join(here, "test.txt"))
     test_min_values = find_2d_mins(test_data)
     test_result_p1 = sum_risks(test_data[test_min_values])
     assert test_result_p1 == 15
     test_sizes = sorted([get_basin_size(test_data, point) for point in np.argwhere(test_min_values)], reverse=True)
     test_result_p2 = test_sizes[0] * test_sizes[1] * test_sizes[2]
     assert test_result_p2 == 1134
+    assert largest_basins(test_data) == test_sizes[:3]
+    test_basin_sizes, test_labels = label_basins(test_data, return_labels=True)
+    assert sorted(test_basin_sizes.tolist(), reverse=True) == test_sizes
+    assert test_labels.max() == len(test_sizes) and np.all((test_labels == 0) == (test_data == 9))
+
+    test_risk_sum, test_tiled_sizes = process_tiles(open_heightmap(os.path.join(here, "test.txt")), 3, offset=ZERO)
+    assert test_risk_sum == 15 and sorted(test_tiled_sizes.tolist(), reverse=True) == test_sizes
 
-    # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    min_values = find_2d_mins(data)
-    result_p1 = sum_risks(data[min_values])
-    print(f"Part1: {result_p1:>8} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    basin_sizes = sorted([get_basin_size(data, location) for location in np.argwhere(min_values)], reverse=True)
-    result_p2 = basin_sizes[0] * basin_sizes[1] * basin_sizes[2]
-    print(f"Part2: {result_p2:>8} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    data = load_case(os.path.join(here, "data.txt"))
+    risk_sum, tiled_sizes = process_tiles(open_heightmap(os.path.join(here, "data.txt")), 37, offset=ZERO)
+    assert risk_sum == solve_p1(data) and sorted(tiled_sizes.tolist()) == sorted(label_basins(data).tolist())
+    print(f"Part1: {solve_p1(data):>8}")
+    print(f"Part2: {solve_p2(data):>8}")
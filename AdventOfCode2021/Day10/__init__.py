@@ -1,6 +1,7 @@
-import time
+import os
+import random
 from collections import deque
-from typing import List, Optional, Sequence
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 closing_mapping = {
     "(": ")",
@@ -23,6 +24,9 @@ p2_score_mapping = {
     ">": 4,
 }
 
+# Completion score of every opening bracket, so the score can be taken straight from the stack
+opening_score_mapping = {opening: p2_score_mapping[closing] for opening, closing in closing_mapping.items()}
+
 
 def find_broken_line(line: str) -> Optional[str]:
     d = deque()
@@ -69,26 +73,178 @@ def count_closing_score(results) -> int:
     return middle_score
 
 
+def classify_line(line: str) -> Tuple[Optional[str], int]:
+    """Returns the first illegal character of a corrupted line, or None and the completion score."""
+    stack = []
+    push, pop = stack.append, stack.pop
+    for char in line:
+        if char in opening_score_mapping:
+            push(char)
+        elif not stack or closing_mapping[pop()] != char:
+            return char, 0
+    score = 0
+    for opening in reversed(stack):
+        score = score * 5 + opening_score_mapping[opening]
+    return None, score
+
+
+def select(values: List[int], k: int) -> int:
+    # k-th smallest value in expected linear time (quickselect), scores can be too big for numpy
+    while True:
+        pivot = random.choice(values)
+        lower = [v for v in values if v < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        no_of_equal = values.count(pivot)
+        if k < len(lower) + no_of_equal:
+            return pivot
+        k -= len(lower) + no_of_equal
+        values = [v for v in values if v > pivot]
+
+
+def score_lines(lines: Iterable[str]) -> Tuple[int, int]:
+    """Syntax error score and middle completion score, with one pass over every line."""
+    error_score = 0
+    completion_scores = []
+    for line in lines:
+        illegal, score = classify_line(line)
+        if illegal:
+            error_score += p1_score_mapping.get(illegal, 0)
+        elif score:
+            completion_scores.append(score)
+    if not completion_scores:
+        return error_score, 0
+    return error_score, select(completion_scores, len(completion_scores) // 2)
+
+
+class LineResult(NamedTuple):
+    line: int  # 0-based line number
+    offset: int  # offset of the illegal character in the stream, or of the end of the line
+    illegal: Optional[str]
+    score: int  # completion score, 0 for corrupted lines
+
+
+class BracketValidator:
+    """
+    Validates a stream of lines fed in chunks of any size, as str or ASCII bytes.
+    Only the stack of open brackets is kept between `feed` calls, so memory is bounded by nesting depth
+    and not by line length. A corrupted line is reported as soon as its illegal character arrives,
+    an incomplete one at its line ending (or at `close` for the last line).
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.line = 0
+        self._stack = []
+        self._corrupted = False
+        self._line_started = False
+
+    def feed(self, chunk: Union[str, bytes]) -> List[LineResult]:
+        if not isinstance(chunk, str):
+            chunk = bytes(chunk).decode("ascii")
+        results = []
+        segments = chunk.split("\n")
+        for i, segment in enumerate(segments):
+            if i:
+                # Previous segment ended with a line ending
+                if not self._corrupted:
+                    results.append(self._complete())
+                self._next_line()
+                self.offset += 1
+            if segment:
+                self._line_started = True
+                if not self._corrupted:
+                    result = self._consume(segment)
+                    if result:
+                        results.append(result)
+                # The rest of a corrupted line is skipped as a whole
+                self.offset += len(segment)
+        return results
+
+    def close(self) -> Optional[LineResult]:
+        # Result of the last line if the stream didn't end with a line ending
+        result = self._complete() if self._line_started and not self._corrupted else None
+        self._next_line()
+        return result
+
+    def _consume(self, segment: str) -> Optional[LineResult]:
+        stack = self._stack
+        push, pop = stack.append, stack.pop
+        for i, char in enumerate(segment):
+            if char in opening_score_mapping:
+                push(char)
+            elif char == "\r":
+                continue
+            elif not stack or closing_mapping[pop()] != char:
+                self._corrupted = True
+                stack.clear()
+                return LineResult(self.line, self.offset + i, char, 0)
+        return None
+
+    def _complete(self) -> LineResult:
+        score = 0
+        for opening in reversed(self._stack):
+            score = score * 5 + opening_score_mapping[opening]
+        return LineResult(self.line, self.offset, None, score)
+
+    def _next_line(self) -> None:
+        self.line += 1
+        self._stack.clear()
+        self._corrupted = False
+        self._line_started = False
+
+
+def validate_stream(chunks: Iterable[Union[str, bytes]]) -> Iterator[LineResult]:
+    validator = BracketValidator()
+    for chunk in chunks:
+        yield from validator.feed(chunk)
+    result = validator.close()
+    if result:
+        yield result
+
+
+def read_chunks(path: str, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
 def load_case(path: str) -> List[str]:
     with open(path, "r") as f:
-        return [line.strip() for line in f.readlines()]
+        return [line.strip() for line in f]
+
+
+def solve_p1(lines: List[str]) -> int:
+    error_score, _ = score_lines(lines)
+    return error_score
+
+
+def solve_p2(lines: List[str]) -> int:
+    _, completion_score = score_lines(lines)
+    return completion_score
 
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_data = load_case("test.txt")
+    test_data = load_case(os.path.join(here, "test.txt"))
     test_result_p1 = count_broken_score(find_broken_line(line) for line in test_data)
     assert test_result_p1 == 26397
     test_result_p2 = count_closing_score(find_closing_brackets(line) for line in test_data)
     assert test_result_p2 == 288957
-
-    # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    result_p1 = count_broken_score(find_broken_line(line) for line in data)
-    print(f"Part1: {result_p1:>10} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    result_p2 = values = count_closing_score(find_closing_brackets(line) for line in data)
-    print(f"Part2: {result_p2:>10} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    assert score_lines(test_data) == (26397, 288957)
+    test_results = list(validate_stream(read_chunks(os.path.join(here, "test.txt"), chunk_size=7)))
+    assert sum(p1_score_mapping[r.illegal] for r in test_results if r.illegal) == 26397
+    test_scores = [r.score for r in test_results if r.score]
+    assert select(test_scores, len(test_scores) // 2) == 288957
+    assert list(validate_stream(["{([(<{}[<>[]}>{[]{[(<()>"])) == [LineResult(0, 12, "}", 0)]
+    assert list(validate_stream(["[({(<(())[]>[[{[]{<()<>>\n", b"<{(["])) == [LineResult(0, 24, None, 288957),
+                                                                               LineResult(1, 29, None, 294)]
+
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(data):>10}")
+    print(f"Part2: {solve_p2(data):>10}")
@@ -1,36 +1,42 @@
-import time
-from typing import Tuple
+import hashlib
+import os
+from typing import List, NamedTuple, Optional, Tuple
 
 import numpy as np
 
+from AdventOfCode2021.loaders import load_digit_grid
 
-def update_data(data: np.ndarray) -> Tuple[np.ndarray, int]:
+
+def neighbour_counts(mask: np.ndarray) -> np.ndarray:
+    """Number of set neighbours (diagonals included) of every cell, over the last two axes."""
+    padding = [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(mask.astype(np.uint8), padding)
+    # The 3x3 box sum is separable: sum rows of three, then columns of three, and leave the cell itself out
+    rows = padded[..., :, :-2] + padded[..., :, 1:-1] + padded[..., :, 2:]
+    box = rows[..., :-2, :] + rows[..., 1:-1, :] + rows[..., 2:, :]
+    return box - mask
+
+
+def flash(data: np.ndarray) -> np.ndarray:
+    """Makes one step in place (over the last two axes) and returns the mask of points that flashed."""
     # Add 1 to all points
     data += 1
-    visited_points = set()
-    keep_going = True
-    while keep_going:
-        keep_going = False
-        # We want to check all points greater than 9 ...
-        points_to_visit = np.argwhere(data > 9)
-        for ix, iy in points_to_visit:
-            if (ix, iy) in visited_points:
-                # ... but we skip already visited points
-                continue
-            # and only if there is at least one unvisited point it is worth to keep going
-            keep_going = True
-            # Add 1 to all neighbours
-            data[max(0, ix - 1):min(data.shape[0], ix + 2), max(0, iy - 1):min(data.shape[1], iy + 2)] += 1
-            # the indexing above includes the point itself and since we should only add 1 to neighbours
-            # we need to remove 1 from the point itself
-            data[ix, iy] -= 1
-            # Finally we update the list of visited points
-            visited_points.add((ix, iy))
-    # Score is the number of points greater than 9
-    score = int(np.sum(data > 9))
-    # Reset points greater than 9
-    data[data > 9] = 0
-    return data, score
+    flashed = np.zeros(data.shape, dtype=bool)
+    flashing = data > 9
+    # Every wave of new flashes adds 1 to all neighbours at once, until a wave flashes nothing new
+    while flashing.any():
+        flashed |= flashing
+        data += neighbour_counts(flashing)
+        flashing = (data > 9) & ~flashed
+    # Reset points that flashed
+    data[flashed] = 0
+    return flashed
+
+
+def update_data(data: np.ndarray) -> Tuple[np.ndarray, int]:
+    flashed = flash(data)
+    # Score is the number of points that flashed
+    return data, int(np.count_nonzero(flashed))
 
 
 def simulate_steps(data, steps) -> int:
@@ -50,30 +56,150 @@ def find_synchronized_step(data, max_steps=1000) -> int:
     raise ValueError(f"Unable to find synchronized step after {max_steps} steps")
 
 
+class OctopusBatch:
+    """
+    Steps a stack of grids (grids, rows, columns) together, with flash totals and synchronization step per grid.
+    With `stop_synchronized` a grid is dropped from the stack at its first synchronized step,
+    so it costs nothing afterwards (and its flash total stops there as well).
+    """
+
+    def __init__(self, grids: np.ndarray, stop_synchronized: bool = False):
+        grids = np.array(grids, dtype=np.uint8)
+        if grids.ndim == 2:
+            grids = grids[np.newaxis]
+        self.stop_synchronized = stop_synchronized
+        self.steps = 0
+        self.flashes = np.zeros(len(grids), dtype=np.int64)
+        # First synchronized step of every grid, 0 until it happens
+        self.synchronized = np.zeros(len(grids), dtype=np.int64)
+        self._grids = grids
+        # Indices and state of grids still being stepped
+        self._active = np.arange(len(grids))
+        self._data = grids.copy()
+
+    @property
+    def grids(self) -> np.ndarray:
+        grids = self._grids.copy()
+        grids[self._active] = self._data
+        return grids
+
+    @property
+    def no_of_active(self) -> int:
+        return self._active.size
+
+    def step(self, steps: int = 1) -> None:
+        for _ in range(steps):
+            if not self._active.size:
+                return
+            self.steps += 1
+            flashed = flash(self._data)
+            self.flashes[self._active] += np.count_nonzero(flashed, axis=(1, 2))
+            # Synchronized step is when all points flashed
+            synchronized = flashed.all(axis=(1, 2))
+            if not synchronized.any():
+                continue
+            first_time = synchronized & (self.synchronized[self._active] == 0)
+            self.synchronized[self._active[first_time]] = self.steps
+            if self.stop_synchronized:
+                self._grids[self._active[synchronized]] = self._data[synchronized]
+                self._active = self._active[~synchronized]
+                self._data = self._data[~synchronized]
+
+    def run_until_synchronized(self, max_steps: int = 1000) -> np.ndarray:
+        """Steps until every grid has synchronized or max_steps is reached, 0 marks grids that never did."""
+        while self.steps < max_steps and np.any(self.synchronized == 0):
+            self.step()
+        return self.synchronized
+
+
+def simulate_steps_batch(grids: np.ndarray, steps: int) -> np.ndarray:
+    batch = OctopusBatch(grids)
+    batch.step(steps)
+    return batch.flashes
+
+
+def find_synchronized_steps(grids: np.ndarray, max_steps: int = 1000) -> np.ndarray:
+    return OctopusBatch(grids, stop_synchronized=True).run_until_synchronized(max_steps)
+
+
+def state_digest(data: np.ndarray) -> bytes:
+    return hashlib.blake2b(np.ascontiguousarray(data, dtype=np.uint8).tobytes(), digest_size=16).digest()
+
+
+class FlashCycle(NamedTuple):
+    start: int  # state after `start` steps is the first one that repeats ...
+    period: int  # ... after every `period` steps
+    totals: List[int]  # total flashes after 0, 1, ..., start + period steps
+    synchronized: Optional[int]  # first synchronized step, None if the grid never synchronizes
+
+    def flashes_after(self, steps: int) -> int:
+        if steps < len(self.totals):
+            return self.totals[steps]
+        cycles, rest = divmod(steps - self.start, self.period)
+        per_cycle = self.totals[self.start + self.period] - self.totals[self.start]
+        return self.totals[self.start + rest] + cycles * per_cycle
+
+
+def find_cycle(data: np.ndarray, max_steps: int = 1_000_000) -> FlashCycle:
+    """
+    Steps a copy of the grid until its state repeats. Every state before the repetition is seen only once,
+    so synchronization either happens within the first start + period steps, or never.
+    """
+    initial = np.array(data, dtype=np.uint8)
+    data = initial.copy()
+    seen = {state_digest(data): 0}
+    totals = [0]
+    synchronized = None
+    for step in range(1, max_steps + 1):
+        flashed = int(np.count_nonzero(flash(data)))
+        totals.append(totals[-1] + flashed)
+        if synchronized is None and flashed == data.size:
+            synchronized = step
+        digest = state_digest(data)
+        start = seen.get(digest)
+        if start is not None:
+            # Make sure it is not a hash collision by simulating the earlier state again
+            earlier = initial.copy()
+            for _ in range(start):
+                flash(earlier)
+            if np.array_equal(earlier, data):
+                return FlashCycle(start=start, period=step - start, totals=totals, synchronized=synchronized)
+        seen[digest] = step
+    raise ValueError(f"Unable to find a cycle after {max_steps} steps")
+
+
 def load_case(path: str) -> np.ndarray:
-    with open(path, "r") as f:
-        lines = [[int(digit.strip()) for digit in line.strip()] for line in f.readlines()]
-        ar = np.array(lines)
-    return ar
+    return load_digit_grid(path)
+
+
+def solve_p1(data: np.ndarray) -> int:
+    # Simulation updates the grid in place, so work on a copy
+    return simulate_steps(data.copy(), 100)
+
+
+def solve_p2(data: np.ndarray) -> int:
+    return find_synchronized_step(data.copy())
 
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_data = load_case("test.txt")
+    test_data = load_case(os.path.join(here, "test.txt"))
     test_result_p1 = simulate_steps(test_data, 100)
     assert test_result_p1 == 1656
-    test_data = load_case("test.txt")
+    test_data = load_case(os.path.join(here, "test.txt"))
     test_result_p2 = find_synchronized_step(test_data)
     assert test_result_p2 == 195, test_result_p2
+    test_grids = np.stack([load_case(os.path.join(here, "test.txt")), np.zeros((10, 10), dtype=np.uint8)])
+    assert simulate_steps_batch(test_grids, 100).tolist() == [1656, 1000]
+    assert find_synchronized_steps(test_grids).tolist() == [195, 10]
+    test_cycle = find_cycle(test_grids[0])
+    assert test_cycle.synchronized == 195
+    assert test_cycle.flashes_after(100) == 1656
+    assert test_cycle.flashes_after(10 ** 6) == simulate_steps_batch(test_grids[:1], 300)[0] + (10 ** 6 - 300) * 10
+    # The middle point flashes on its own, pulls the left one along, and the right one is back at 2 again
+    assert find_cycle(np.array([[0, 0, 2]], dtype=np.uint8)) == FlashCycle(0, 9, [0, 0, 0, 0, 0, 0, 0, 0, 1, 3], None)
 
-    # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    result_p1 = simulate_steps(data, 100)
-    print(f"Part1: {result_p1:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    result_p2 = find_synchronized_step(data)
-    print(f"Part2: {result_p2:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(data):>6}")
+    print(f"Part2: {solve_p2(data):>6}")
@@ -1,6 +1,6 @@
-import time
+import os
 from collections import defaultdict
-from typing import List
+from typing import Dict, List, Tuple
 
 
 class Graph:
@@ -31,7 +31,7 @@ class Graph:
 
 def load_case(path: str) -> Graph:
     with open(path, "r") as f:
-        lines = [line.strip() for line in f.readlines()]
+        lines = [line.strip() for line in f]
     g = Graph(raw_edges=lines)
     return g
 
@@ -76,22 +76,79 @@ def count_paths_in_graph(graph: Graph, start: str = "start", end: str = "end", o
     return search_vertex(name=start, score=0)
 
 
+class PathCounter:
+    """
+    Counts paths without enumerating them. Vertices get integer IDs and visited small caves are kept as a bitmask,
+    so the number of paths from a vertex only depends on (vertex, visited small caves, small cave revisit used)
+    and is computed once per such state.
+    """
+
+    def __init__(self, graph: Graph, start: str = "start", end: str = "end"):
+        self.ids = {name: i for i, name in enumerate(graph.vertices)}
+        for name in (start, end):
+            if name not in self.ids:
+                raise ValueError(f"There is no {name!r} cave in the graph")
+        for name in graph.vertices:
+            for _, neighbour_name in graph[name]:
+                if not is_small(name) and not is_small(neighbour_name):
+                    raise ValueError(f"Big caves {name} and {neighbour_name} are connected, there are infinitely many paths")
+        self.start = self.ids[start]
+        self.end = self.ids[end]
+        # Bit of every small cave, big caves have none since they can be visited any number of times
+        self._bits = [1 << i if is_small(name) else 0 for i, name in enumerate(graph.vertices)]
+        # Nobody goes back to the start cave
+        self._neighbours = [
+            tuple(self.ids[neighbour_name] for _, neighbour_name in graph[name] if neighbour_name != start)
+            for name in graph.vertices
+        ]
+
+    def count(self, only_once: bool = True) -> int:
+        bits, neighbours, end = self._bits, self._neighbours, self.end
+        memo: Dict[Tuple[int, int, bool], int] = {}
+
+        def paths_from(vertex: int, visited: int, revisit_used: bool) -> int:
+            if vertex == end:
+                return 1
+            key = (vertex, visited, revisit_used)
+            if key in memo:
+                return memo[key]
+            paths = 0
+            for neighbour in neighbours[vertex]:
+                bit = bits[neighbour]
+                if not visited & bit:
+                    paths += paths_from(neighbour, visited | bit, revisit_used)
+                elif not revisit_used:
+                    # Second visit of a small cave, allowed once per path
+                    paths += paths_from(neighbour, visited, True)
+            memo[key] = paths
+            return paths
+
+        # When every small cave can be visited only once, the single revisit is used up from the start
+        return paths_from(self.start, bits[self.start], only_once)
+
+
+def solve_p1(graph: Graph) -> int:
+    return PathCounter(graph).count(only_once=True)
+
+
+def solve_p2(graph: Graph) -> int:
+    return PathCounter(graph).count(only_once=False)
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_graph = load_case("test.txt")
+    test_graph = load_case(os.path.join(here, "test.txt"))
     test_result_p1 = count_paths_in_graph(test_graph, only_once=True)
     assert test_result_p1 == 10, test_result_p1
     test_result_p2 = count_paths_in_graph(test_graph, only_once=False)
     assert test_result_p2 == 36, test_result_p2
-
-    # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    result_p1 = count_paths_in_graph(data, only_once=True)
-    print(f"Part1: {result_p1:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    data = load_case("data.txt")
-    t = time.perf_counter()
-    result_p2 = count_paths_in_graph(data, only_once=False)
-    print(f"Part2: {result_p2:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    test_counter = PathCounter(test_graph)
+    assert (test_counter.count(only_once=True), test_counter.count(only_once=False)) == (10, 36)
+    # Every small cave is connected to every other one through the big cave A
+    test_graph = Graph([f"start-{x}" for x in "abcdef"] + [f"{x}-A" for x in "abcdef"] + ["A-end"])
+    assert PathCounter(test_graph).count(only_once=True) == count_paths_in_graph(test_graph, only_once=True)
+
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(data):>6}")
+    print(f"Part2: {solve_p2(data):>6}")
@@ -1,4 +1,4 @@
-import time
+import os
 from typing import Tuple, List
 
 import numpy as np
@@ -9,7 +9,7 @@ def load_case(path: str) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
         points = []
         folds = []
         add_points = True
-        for line in f.readlines():
+        for line in f:
             if not line.strip():
                 add_points = False
                 continue
@@ -32,38 +32,40 @@ def fold(ar: np.ndarray, axis: str, line: int) -> np.ndarray:
     return ar[f1, :] + ar[f2, :] if axis == "y" else ar[:, f1] + ar[:, f2]
 
 
+def render_data(ar: np.ndarray) -> str:
+    return "\n".join("".join("█" if e else " " for e in row) for row in ar)
+
+
 def pprint_data(ar: np.ndarray) -> None:
-    for row in ar:
-        line = "".join("█" if e else " " for e in row)
-        print(line)
+    print(render_data(ar))
+
+
+def solve_p1(case: Tuple[np.ndarray, List[Tuple[str, int]]]) -> int:
+    sheet, folds = case
+    return int(np.sum(fold(sheet, *folds[0])))
+
+
+def solve_p2(case: Tuple[np.ndarray, List[Tuple[str, int]]]) -> str:
+    sheet, folds = case
+    for a, l in folds:
+        sheet = fold(sheet, a, l)
+    return render_data(sheet)
 
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_sheet, test_folds = load_case("test.txt")
+    test_sheet, test_folds = load_case(os.path.join(here, "test.txt"))
     # Fold once
     folded_test_sheet = fold(test_sheet, *test_folds[0])
     test_result_p1 = np.sum(folded_test_sheet).astype(int)
     assert test_result_p1 == 17, test_result_p1
     # Fold all
-    test_sheet, test_folds = load_case("test.txt")
+    test_sheet, test_folds = load_case(os.path.join(here, "test.txt"))
     for a, l in test_folds:
         test_sheet = fold(test_sheet, a, l)
     pprint_data(test_sheet)
 
-    # Part 1
-    data_sheet, data_folds = load_case("data.txt")
-    t = time.perf_counter()
-    # Fold once
-    folded_sheet = fold(data_sheet, *data_folds[0])
-    result_p1 = np.sum(folded_sheet).astype(int)
-    print(f"Part1: {result_p1:>8} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    data_sheet, data_folds = load_case("data.txt")
-    t = time.perf_counter()
-    for a, l in data_folds:
-        data_sheet = fold(data_sheet, a, l)
-    result_p2 = "BLHFJPJF"
-    print(f"Part2: {result_p2:>8} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-    pprint_data(data_sheet)
+    case = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(case):>8}")
+    print(f"Part2:\n{solve_p2(case)}")
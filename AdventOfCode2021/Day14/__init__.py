@@ -1,4 +1,4 @@
-import time
+import os
 from collections import Counter
 from functools import lru_cache
 from typing import Tuple, Dict
@@ -11,7 +11,7 @@ def load_case(path: str) -> Tuple[str, Dict]:
         f.readline()
         # Read rules
         rules_dict = {}
-        for line in f.readlines():
+        for line in f:
             m, a = line.strip().split(" -> ")
             rules_dict[m] = a
     return initial_polymer, rules_dict
@@ -69,24 +69,25 @@ def count_score(polymer_counter: Counter) -> int:
     return score
 
 
+def solve_p1(case: Tuple[str, Dict]) -> int:
+    return count_score(polymer_counter=count_polymer(*case, 10))
+
+
+def solve_p2(case: Tuple[str, Dict]) -> int:
+    return count_score(polymer_counter=count_polymer(*case, 40))
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_polymer, test_rules = load_case("test.txt")
+    test_polymer, test_rules = load_case(os.path.join(here, "test.txt"))
     test_result_p1 = count_score(polymer_counter=count_polymer(test_polymer, test_rules, 10))
     assert test_result_p1 == 1588, test_result_p1
 
-    test_polymer, test_rules = load_case("test.txt")
+    test_polymer, test_rules = load_case(os.path.join(here, "test.txt"))
     test_result_p2 = count_score(polymer_counter=count_polymer(test_polymer, test_rules, 40))
     assert test_result_p2 == 2188189693529, test_result_p2
 
-    # Part 1
-    polymer, rules = load_case("data.txt")
-    t = time.perf_counter()
-    result_p1 = count_score(polymer_counter=count_polymer(polymer, rules, 10))
-    print(f"Part1: {result_p1:>15} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    polymer, rules = load_case("data.txt")
-    t = time.perf_counter()
-    result_p2 = count_score(polymer_counter=count_polymer(polymer, rules, 40))
-    print(f"Part2: {result_p2:>15} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    case = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(case):>15}")
+    print(f"Part2: {solve_p2(case):>15}")
@@ -1,9 +1,7 @@
 import dataclasses
-import time
+import os
 from typing import List, TypeVar, Generic, Optional, Tuple
 import heapq
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
 
 T = TypeVar("T")
 
@@ -40,9 +38,9 @@ class PriorityQueue(Generic[T]):
 
 
 def load_case(path: str) -> List[List[int]]:
+    # Parsed without the numpy based loaders, Dijkstra below works on Python ints and numpy would only slow the import
     with open(path, "r") as f:
-        data = [[int(e) for e in line.strip()] for line in f.readlines()]
-    return data
+        return [[int(e) for e in line.strip()] for line in f if line.strip()]
 
 
 def multiply_data(data: List[List[int]], factor: int = 2) -> List[List[int]]:
@@ -106,7 +104,21 @@ def find_shortest_path(
     return distances[(ex, ey)], end_path[::-1]
 
 
+def solve_p1(data: List[List[int]]) -> int:
+    distance, _ = find_shortest_path(data)
+    return distance
+
+
+def solve_p2(data: List[List[int]]) -> int:
+    distance, _ = find_shortest_path(multiply_data(data, factor=5))
+    return distance
+
+
 def plot_path(data, path):
+    # matplotlib is slow to import and only needed for plotting, so don't pay for it on import
+    import matplotlib.pyplot as plt
+    import matplotlib.cm as cm
+
     plt.imshow(data, cmap=cm.Reds)
     plt.plot(*path[0], "bo", linestyle="none")
     plt.plot(*path[-1], "b.", linestyle="none")
@@ -116,8 +128,9 @@ def plot_path(data, path):
 
 
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
     # Test
-    test_data = load_case("test.txt")
+    test_data = load_case(os.path.join(here, "test.txt"))
     # print(test_data)
     test_result_p1, test_end_path = find_shortest_path(test_data)
     plot_path(test_data, test_end_path)
@@ -129,15 +142,13 @@ if __name__ == '__main__':
     plot_path(test_data_2, test_end_path_2)
 
     # Part 1
-    data = load_case("data.txt")
-    t = time.perf_counter()
+    data = load_case(os.path.join(here, "data.txt"))
     result_p1, end_path = find_shortest_path(data)
-    print(f"Part1: {result_p1:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    print(f"Part1: {result_p1:>6}")
     plot_path(data, end_path)
 
     # Part 2
     data_2 = multiply_data(data, factor=5)
-    t = time.perf_counter()
     result_p2, end_path_2 = find_shortest_path(data_2)
-    print(f"Part2: {result_p2:>6} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    print(f"Part2: {result_p2:>6}")
     plot_path(data_2, end_path_2)
@@ -1,4 +1,4 @@
-import time
+import os
 from functools import reduce
 from typing import Tuple
 
@@ -86,7 +86,21 @@ def sum_versions(packet: Packet) -> int:
     return sv
 
 
+def load_case(path: str) -> str:
+    with open(path, "r") as f:
+        return f.readline().strip()
+
+
+def solve_p1(hex_str: str) -> int:
+    return sum_versions(Packet(hex_str=hex_str))
+
+
+def solve_p2(hex_str: str) -> int:
+    return Packet(hex_str=hex_str).get_value()
+
+
 if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
 
     # Test 1
     test_cases = (
@@ -114,14 +128,6 @@ if __name__ == '__main__':
     for test_data, expected_value in test_cases:
         assert Packet(hex_str=test_data).get_value() == expected_value
 
-    with open("data.txt") as f:
-        data = f.readline().strip()
-    # Part 1
-    t = time.perf_counter()
-    result_p1 = sum_versions(Packet(hex_str=data))
-    print(f"Part1: {result_p1:>12} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
-
-    # Part 2
-    t = time.perf_counter()
-    result_p2 = Packet(hex_str=data).get_value()
-    print(f"Part2: {result_p2:>12} (t: {1000 * (time.perf_counter() - t):.3f} ms)")
+    data = load_case(os.path.join(here, "data.txt"))
+    print(f"Part1: {solve_p1(data):>12}")
+    print(f"Part2: {solve_p2(data):>12}")
@@ -0,0 +1,70 @@
+"""
+Command line entry point.
+
+    python -m AdventOfCode2021 run 7
+    python -m AdventOfCode2021 run Day12 --part 2 --input my_input.txt
+
+Only the requested day gets imported, and import, load and solve times are reported separately.
+"""
+import argparse
+import sys
+import time
+from typing import Optional, Sequence
+
+from AdventOfCode2021.days import day_name, import_day, input_path, list_days
+
+PARTS = (1, 2)
+# Modules worth watching, since importing them dominates the cold start
+HEAVY_MODULES = ("numpy", "matplotlib")
+
+
+def _ms(seconds: float) -> str:
+    return f"{1000 * seconds:.3f} ms"
+
+
+def run(day: str, parts: Sequence[int] = PARTS, path: Optional[str] = None) -> None:
+    day = day_name(day)
+    path = path if path else input_path(day)
+
+    already_loaded = set(sys.modules)
+    t = time.perf_counter()
+    module = import_day(day)
+    import_time = time.perf_counter() - t
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules and m not in already_loaded]
+    print(f"{day} import: {_ms(import_time)}" + (f" (pulled in: {', '.join(heavy)})" if heavy else ""))
+
+    t = time.perf_counter()
+    case = module.load_case(path)
+    print(f"{day} load:   {_ms(time.perf_counter() - t)}")
+
+    for part in parts:
+        t = time.perf_counter()
+        answer = getattr(module, f"solve_p{part}")(case)
+        solve_time = time.perf_counter() - t
+        if isinstance(answer, str) and "\n" in answer:
+            print(f"Part{part}: (t: {_ms(solve_time)})\n{answer}")
+        else:
+            print(f"Part{part}: {answer} (t: {_ms(solve_time)})")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m AdventOfCode2021")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="solve a single day")
+    run_parser.add_argument("day", help="day to solve, e.g. 7, 07 or Day07")
+    run_parser.add_argument("--part", type=int, choices=PARTS, action="append", help="solve only selected part(s)")
+    run_parser.add_argument("--input", metavar="PATH", help="puzzle input (default: the day's data.txt)")
+    args = parser.parse_args(argv)
+
+    try:
+        day = day_name(args.day)
+    except ValueError as e:
+        parser.error(str(e))
+    if day not in list_days():
+        parser.error(f"There is no solution for {day}")
+    run(day, parts=args.part or PARTS, path=args.input)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark runner for all the days.
+
+Every day exposes `load_case(path)`, `solve_p1(case)` and `solve_p2(case)`.
+Input is loaded fresh before every run (some solvers work in place), and only the solver call is timed.
+
+    python -m AdventOfCode2021.bench --repeat 10 --json bench.json
+    python -m AdventOfCode2021.bench --baseline bench.json --threshold 0.2
+"""
+import argparse
+import dataclasses
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from typing import List, Dict, Optional, Sequence, Tuple
+
+from AdventOfCode2021.days import list_days, import_day, input_path, day_name
+
+PARTS = (1, 2)
+
+
+@dataclasses.dataclass()
+class PartTiming:
+    day: str
+    part: int
+    answer: str
+    runs: List[float]
+
+    @property
+    def min(self) -> float:
+        return min(self.runs)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.runs)
+
+    @property
+    def p95(self) -> float:
+        # Nearest-rank percentile
+        ordered = sorted(self.runs)
+        return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def to_dict(self) -> Dict:
+        return {
+            "day": self.day,
+            "part": self.part,
+            "answer": self.answer,
+            "repeat": len(self.runs),
+            "min_ms": 1000 * self.min,
+            "median_ms": 1000 * self.median,
+            "p95_ms": 1000 * self.p95,
+        }
+
+
+def benchmark_part(day: str, part: int, warmup: int = 1, repeat: int = 5, path: str = None) -> PartTiming:
+    module = import_day(day)
+    solver = getattr(module, f"solve_p{part}")
+    path = path if path else input_path(day)
+    answer = None
+    runs = []
+    for i in range(warmup + repeat):
+        case = module.load_case(path)
+        t = time.perf_counter()
+        answer = solver(case)
+        elapsed = time.perf_counter() - t
+        if i >= warmup:
+            runs.append(elapsed)
+    return PartTiming(day=day_name(day), part=part, answer=str(answer), runs=runs)
+
+
+def run_benchmarks(days: Sequence[str], parts: Sequence[int] = PARTS, warmup: int = 1, repeat: int = 5) -> List[PartTiming]:
+    results = []
+    for day in days:
+        for part in parts:
+            try:
+                timing = benchmark_part(day, part, warmup=warmup, repeat=repeat)
+            except ImportError as e:
+                print(f"{day_name(day)}: skipped ({e})", file=sys.stderr)
+                break
+            print(format_timing(timing), file=sys.stderr)
+            results.append(timing)
+    return results
+
+
+def find_regressions(results: List[PartTiming], baseline: Dict, threshold: float) -> List[Tuple[PartTiming, float]]:
+    # Compare medians, they are far less noisy than single runs
+    baseline_medians = {(r["day"], r["part"]): r["median_ms"] for r in baseline["results"]}
+    regressions = []
+    for timing in results:
+        base = baseline_medians.get((timing.day, timing.part))
+        if base is not None and 1000 * timing.median > base * (1 + threshold):
+            regressions.append((timing, base))
+    return regressions
+
+
+def format_timing(timing: PartTiming) -> str:
+    return (f"{timing.day} p{timing.part}: "
+            f"min {1000 * timing.min:>10.3f} ms  "
+            f"median {1000 * timing.median:>10.3f} ms  "
+            f"p95 {1000 * timing.p95:>10.3f} ms")
+
+
+def to_json(results: List[PartTiming], warmup: int) -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "warmup": warmup,
+        "results": [r.to_dict() for r in results],
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m AdventOfCode2021.bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("days", nargs="*", help="days to run, e.g. 1 07 Day12 (default: all)")
+    parser.add_argument("--part", type=int, choices=PARTS, action="append", help="run only selected part(s)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before measuring (default: 1)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per part (default: 5)")
+    parser.add_argument("--json", metavar="PATH", help="write machine-readable results, '-' for stdout")
+    parser.add_argument("--baseline", metavar="PATH", help="results file of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed relative slowdown of the median before failing (default: 0.1)")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    days = [day_name(d) for d in args.days] if args.days else list_days()
+    results = run_benchmarks(days, parts=args.part or PARTS, warmup=args.warmup, repeat=args.repeat)
+
+    if args.json:
+        output = json.dumps(to_json(results, warmup=args.warmup), indent=2)
+        if args.json == "-":
+            print(output)
+        else:
+            with open(args.json, "w") as f:
+                f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, threshold=args.threshold)
+        for timing, base in regressions:
+            print(f"REGRESSION {timing.day} p{timing.part}: "
+                  f"median {1000 * timing.median:.3f} ms vs baseline {base:.3f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import importlib
+import os
+import pkgutil
+import re
+from types import ModuleType
+from typing import List, Union
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DAY_PATTERN = re.compile(r"Day\d{2}")
+
+
+def list_days() -> List[str]:
+    # Every day is a sub-package named DayNN sitting next to this file
+    return sorted(m.name for m in pkgutil.iter_modules([PACKAGE_DIR]) if m.ispkg and DAY_PATTERN.fullmatch(m.name))
+
+
+def day_name(day: Union[int, str]) -> str:
+    # Accept 1, "1", "01" and "Day01"
+    day = str(day)
+    if DAY_PATTERN.fullmatch(day):
+        return day
+    if not day.isdigit():
+        raise ValueError(f"Unknown day: {day!r}")
+    return f"Day{int(day):02d}"
+
+
+def import_day(day: Union[int, str]) -> ModuleType:
+    return importlib.import_module(f"{__package__}.{day_name(day)}")
+
+
+def input_path(day: Union[int, str], name: str = "data.txt") -> str:
+    return os.path.join(PACKAGE_DIR, day_name(day), name)
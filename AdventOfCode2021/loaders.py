@@ -0,0 +1,118 @@
+"""
+Shared input loading.
+
+Files are memory-mapped and decoded in bulk with numpy, so there is no per-line (or per-character) Python work
+for the big inputs. Line-oriented inputs can be streamed instead of read with `readlines()`.
+"""
+import os
+from typing import Iterator
+
+import numpy as np
+
+ZERO = ord("0")
+NEWLINE = ord("\n")
+WHITESPACE = b" \t\r\n"
+POWERS_OF_10 = 10 ** np.arange(18, dtype=np.int64)
+
+
+def map_file(path: str) -> np.ndarray:
+    # np.memmap can't map empty files
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def _content_size(raw: np.ndarray) -> int:
+    # Size without trailing whitespace (usually the final newline)
+    size = raw.size
+    while size and raw[size - 1] in WHITESPACE:
+        size -= 1
+    return size
+
+
+def _find(raw: np.ndarray, value: int, size: int, chunk_size: int = 1 << 16) -> int:
+    # Scan chunk by chunk so only the beginning of a big file gets touched
+    for start in range(0, size, chunk_size):
+        found = np.flatnonzero(raw[start:min(size, start + chunk_size)] == value)
+        if found.size:
+            return start + int(found[0])
+    return -1
+
+
+def map_digit_grid(path: str) -> np.ndarray:
+    """
+    Returns a (rows, columns) view of the raw bytes of a file with equally long lines of digits.
+    Nothing is copied or decoded, the values are still ASCII codes (see `load_digit_grid`).
+    """
+    raw = map_file(path)
+    size = _content_size(raw)
+    if not size:
+        return np.zeros((0, 0), dtype=np.uint8)
+    first_newline = _find(raw, NEWLINE, size)
+    if first_newline < 0:
+        return raw[:size].reshape(1, size)
+    line_length = first_newline + 1
+    # Strip "\r" of Windows line endings
+    width = line_length - 2 if line_length > 1 and raw[line_length - 2] == ord("\r") else line_length - 1
+    # The last line has no line ending after trimming, hence the rounding
+    rows = (size + line_length - width) // line_length
+    line_endings = np.lib.stride_tricks.as_strided(raw[line_length - 1:], shape=(rows - 1,), strides=(line_length,))
+    if rows * line_length - (line_length - width) != size or np.any(line_endings != NEWLINE):
+        raise ValueError(f"Lines in {path} are not equally long")
+    return np.lib.stride_tricks.as_strided(raw, shape=(rows, width), strides=(line_length, 1), writeable=False)
+
+
+def load_digit_grid(path: str) -> np.ndarray:
+    """Loads a file of equally long lines of digits into a uint8 array."""
+    grid = np.subtract(map_digit_grid(path), ZERO, dtype=np.uint8)
+    # Anything else than a digit wraps around to a value greater than 9
+    if grid.size and grid.max() > 9:
+        raise ValueError(f"{path} contains non digit characters")
+    return grid
+
+
+def parse_ints(raw: np.ndarray) -> np.ndarray:
+    """
+    Decodes all integers from an array of bytes.
+    Any character other than a digit or a leading minus separates numbers, so this handles "1,2,3"
+    as well as whitespace separated columns.
+    """
+    raw = np.asarray(raw, dtype=np.uint8)
+    is_digit = (raw >= ZERO) & (raw <= ZERO + 9)
+    digit_positions = np.flatnonzero(is_digit)
+    if not digit_positions.size:
+        return np.zeros(0, dtype=np.int64)
+    # A number starts at a digit that doesn't follow another digit, and ends at a digit not followed by one
+    is_start = np.diff(digit_positions, prepend=-2) != 1
+    starts = np.flatnonzero(is_start)
+    digits = (raw[digit_positions] - ZERO).astype(np.int64)
+    if starts.size == digits.size:
+        # Only single digit numbers
+        numbers = digits
+    else:
+        ends = np.append(starts[1:], digit_positions.size) - 1
+        # Every digit is multiplied by 10 to the power of its distance from the end of its number
+        number_index = np.cumsum(is_start) - 1
+        exponents = ends[number_index] - np.arange(digit_positions.size)
+        if exponents.max() > 17:
+            raise ValueError("Numbers with more than 18 digits don't fit into int64")
+        numbers = np.add.reduceat(digits * POWERS_OF_10[exponents], starts)
+    # Apply minus signs placed directly before a number
+    first_digits = digit_positions[starts]
+    is_negative = np.zeros(starts.size, dtype=bool)
+    has_prefix = first_digits > 0
+    is_negative[has_prefix] = raw[first_digits[has_prefix] - 1] == ord("-")
+    numbers[is_negative] *= -1
+    return numbers
+
+
+def load_ints(path: str) -> np.ndarray:
+    """Loads all integers (comma, whitespace or newline separated) from a file into an int64 array."""
+    return parse_ints(map_file(path))
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    """Streams lines of a file without line endings, blank lines included."""
+    with open(path, "r") as f:
+        for line in f:
+            yield line.rstrip("\r\n")